@@ -0,0 +1,7 @@
+import redis.asyncio as redis
+from .config import get_settings
+
+settings = get_settings()
+
+# Shared connection pool for the gateway's Redis reads and caches
+redis_client = redis.Redis.from_url(settings.redis_url)
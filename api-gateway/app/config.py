@@ -13,6 +13,11 @@ class Settings(BaseSettings):
 
     # Database
     database_url: str = ""
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    # asyncpg prepared statement cache; set to 0 behind PgBouncer in
+    # transaction mode, which cannot keep prepared statements
+    db_statement_cache_size: int = 100
 
     # Redis
     redis_url: str = "redis://localhost:6379"
@@ -25,9 +30,26 @@ class Settings(BaseSettings):
     api_version: str = "1.0.0"
     api_description: str = "Scalable image import system from Google Drive and Dropbox"
 
+    # Express imports: folders this small are transferred by the gateway
+    # itself instead of being queued for the workers
+    express_max_files: int = 20
+    express_max_bytes: int = 50 * 1024 * 1024
+    express_concurrency: int = 8  # Concurrent transfers per express import
+    express_listing_timeout: float = 3.0  # seconds before the folder is queued
+
+    # Seconds between keep-alive comments on idle job event streams
+    sse_keepalive_interval: float = 15.0
+
+    # Seconds the bulk job status server_time is set back by, so changes
+    # committed by transactions that started before a refresh are not missed
+    job_status_since_margin: float = 30.0
+
     # Pagination defaults
     default_page_size: int = 20
     max_page_size: int = 100
+    image_count_cache_ttl: int = 30  # seconds an exact image total is reused
+    image_cache_ttl: int = 300  # seconds an image response stays cached
+    export_batch_size: int = 1000  # Rows fetched per round trip in exports
 
     class Config:
         env_file = ".env"
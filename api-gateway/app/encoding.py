@@ -0,0 +1,67 @@
+"""
+Fast encoding of image rows for list responses and exports.
+
+Encodes plain row tuples with orjson, producing the same bytes as the
+pydantic response models' ``model_dump_json()`` without building a model
+per row.
+"""
+import csv
+import io
+from typing import Any, Sequence
+import orjson
+from .schemas import ImageListResponse, ImageResponse
+
+# Fields of an image in list responses, in ImageResponse order
+IMAGE_FIELDS = tuple(ImageResponse.model_fields)
+
+# Columns of an image in catalog exports
+EXPORT_FIELDS = (
+    "id",
+    "name",
+    "google_drive_id",
+    "dropbox_id",
+    "source",
+    "size",
+    "mime_type",
+    "source_path",
+    "storage_path",
+    "storage_url",
+    "content_hash",
+    "import_job_id",
+    "created_at",
+)
+
+
+def encode_image_list(images: Sequence[Sequence[Any]], **fields: Any) -> str:
+    """
+    Serialize an image list page.
+
+    Args:
+        images: Rows holding the IMAGE_FIELDS columns, in that order
+        fields: The remaining ImageListResponse fields
+    """
+    body = {"images": [dict(zip(IMAGE_FIELDS, row)) for row in images], **fields}
+    ordered = {name: body[name] for name in ImageListResponse.model_fields}
+    # Pydantic writes UTC offsets as "Z"
+    return orjson.dumps(ordered, option=orjson.OPT_UTC_Z).decode()
+
+
+def encode_ndjson(rows: Sequence[Sequence[Any]]) -> bytes:
+    """Serialize EXPORT_FIELDS rows as newline-delimited JSON."""
+    return b"".join(
+        orjson.dumps(dict(zip(EXPORT_FIELDS, row)), option=orjson.OPT_UTC_Z) + b"\n"
+        for row in rows
+    )
+
+
+def encode_csv(rows: Sequence[Sequence[Any]], header: bool = False) -> bytes:
+    """Serialize EXPORT_FIELDS rows as CSV, optionally after a header line."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    writer.writerows(
+        [value.isoformat() if hasattr(value, "isoformat") else value for value in row]
+        for row in rows
+    )
+    return buffer.getvalue().encode()
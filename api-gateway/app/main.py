@@ -5,6 +5,7 @@ from contextlib import asynccontextmanager
 from .config import get_settings
 from .database import engine, Base
 from .routes import import_router, image_router
+from .services.job_events import job_event_broker
 
 settings = get_settings()
 
@@ -13,10 +14,12 @@ settings = get_settings()
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup/shutdown events."""
     # Startup: Create tables if they don't exist
-    Base.metadata.create_all(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
     yield
-    # Shutdown: cleanup if needed
-    pass
+    # Shutdown: stop relaying job events and close pooled connections
+    await job_event_broker.close()
+    await engine.dispose()
 
 
 # Create FastAPI app
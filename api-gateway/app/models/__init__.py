@@ -1,3 +1,3 @@
-from .image import Image, ImportJob
+from .image import Image, ImportJob, SyncState
 
-__all__ = ["Image", "ImportJob"]
+__all__ = ["Image", "ImportJob", "SyncState"]
@@ -1,5 +1,15 @@
-from sqlalchemy import Column, Integer, String, BigInteger, Text, DateTime, Index
-from sqlalchemy.sql import func
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    BigInteger,
+    Text,
+    DateTime,
+    Boolean,
+    Index,
+    UniqueConstraint,
+)
+from sqlalchemy.sql import func, text
 from ..database import Base
 
 
@@ -15,10 +25,13 @@ class Image(Base):
     source = Column(String(50), nullable=False)  # 'google_drive' or 'dropbox'
     size = Column(BigInteger, nullable=False)
     mime_type = Column(String(100), nullable=False)
+    source_path = Column(Text, nullable=True)  # Path within the source folder
     storage_path = Column(Text, nullable=False)
     storage_url = Column(Text, nullable=False)
+    content_hash = Column(String(64), nullable=True)  # SHA-256 of shared blob
     import_job_id = Column(String(255), nullable=True)
-    status = Column(String(50), default="completed")
+    ingest_key = Column(String(512), nullable=True)  # job + source file, for idempotent writes
+    status = Column(String(50), default="completed")  # completed, replaced, deleted
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
@@ -27,6 +40,22 @@ class Image(Base):
     __table_args__ = (
         Index("idx_images_source", "source"),
         Index("idx_images_job_id", "import_job_id"),
+        Index("idx_images_content_hash", "content_hash"),
+        # Listing order (newest first) for keyset pagination
+        Index(
+            "idx_images_listing",
+            "created_at",
+            "id",
+            postgresql_where=text("status = 'completed'"),
+        ),
+        Index(
+            "idx_images_source_listing",
+            "source",
+            "created_at",
+            "id",
+            postgresql_where=text("status = 'completed'"),
+        ),
+        UniqueConstraint("ingest_key", name="uq_images_ingest_key"),
     )
 
 
@@ -38,12 +67,40 @@ class ImportJob(Base):
     id = Column(String(255), primary_key=True)
     source = Column(String(50), nullable=False)
     source_url = Column(Text, nullable=False)
+    source_key = Column(Text, nullable=True)  # Folder ID or normalized shared link
+    job_type = Column(String(50), default="import")  # import, sync
     total_files = Column(Integer, default=0)
     processed_files = Column(Integer, default=0)
     failed_files = Column(Integer, default=0)
-    status = Column(String(50), default="pending")  # pending, processing, completed, failed
+    status = Column(String(50), default="pending")  # pending, listing, processing, completed, failed
     error_message = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
     completed_at = Column(DateTime(timezone=True), nullable=True)
 
-    __table_args__ = (Index("idx_jobs_status", "status"),)
+    __table_args__ = (
+        Index("idx_jobs_status", "status"),
+        Index("idx_jobs_source_key", "source", "source_key"),
+    )
+
+
+class SyncState(Base):
+    """Model for remembering where the last sync of a source folder stopped."""
+
+    __tablename__ = "sync_states"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    source = Column(String(50), nullable=False)
+    source_key = Column(Text, nullable=False)
+    source_url = Column(Text, nullable=False)
+    cursor = Column(Text, nullable=True)  # Dropbox list_folder cursor
+    last_synced_at = Column(DateTime(timezone=True), nullable=True)
+    watched = Column(Boolean, default=False)  # Re-synced periodically
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("source", "source_key", name="uq_sync_states_source_key"),
+        Index("idx_sync_states_watched", "watched"),
+    )
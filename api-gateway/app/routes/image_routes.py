@@ -1,42 +1,93 @@
-from fastapi import APIRouter, Query, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import Optional
-from ..database import get_db
+import base64
+import json
+from datetime import datetime
+from fastapi import APIRouter, Query, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Literal, Optional, Tuple
+from ..database import SessionLocal, get_db
 from ..models import Image
 from ..schemas import ImageResponse, ImageListResponse
+from ..services.image_count import ImageCountService
+from ..services.response_cache import ResponseCacheService, conditional_response
 from ..config import get_settings
+from ..encoding import (
+    EXPORT_FIELDS,
+    IMAGE_FIELDS,
+    encode_csv,
+    encode_image_list,
+    encode_ndjson,
+)
 
 router = APIRouter(prefix="/images", tags=["Images"])
 settings = get_settings()
 
 
+def encode_cursor(created_at: datetime, image_id: int) -> str:
+    """Opaque token for the position right after an image."""
+    position = {"created_at": created_at.isoformat(), "id": image_id}
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Read the position from a cursor token."""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(position["created_at"]), int(position["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("", response_model=ImageListResponse)
 async def list_images(
+    request: Request,
     source: Optional[str] = Query(
         None,
         description="Filter by source: 'google_drive' or 'dropbox'",
     ),
     page: int = Query(1, ge=1, description="Page number"),
+    approximate: bool = Query(
+        False,
+        description="Estimate the total from table statistics instead of counting",
+    ),
+    cursor: Optional[str] = Query(
+        None,
+        description="next_cursor from the previous response; replaces page",
+    ),
     limit: int = Query(
         None,
         ge=1,
         le=settings.max_page_size,
         description=f"Items per page (max {settings.max_page_size})",
     ),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Get a paginated list of all imported images.
 
     Supports filtering by source (google_drive or dropbox).
+
+    Pass the ``next_cursor`` of a response as ``cursor`` to get the next
+    page. Cursor pages seek straight to their position, so they stay fast
+    however deep the client scrolls; ``page`` numbers are still accepted
+    for compatibility.
+
+    Totals are cached briefly; with ``approximate`` they are estimated from
+    table statistics, and ``total_exact`` is false.
+
+    Pages are cached until an import changes their source, and answer
+    ``If-None-Match`` / ``If-Modified-Since`` with 304 when unchanged.
     """
     # Default page size
     if limit is None:
         limit = settings.default_page_size
 
-    # Build query
-    query = db.query(Image)
+    # Build query; rows removed or superseded by a sync are hidden. Only
+    # the response columns are read, as plain rows
+    query = select(
+        *(getattr(Image, field) for field in IMAGE_FIELDS)
+    ).where(Image.status == "completed")
 
     # Apply source filter if provided
     if source:
@@ -49,42 +100,131 @@ async def list_images(
                 pages=0,
                 page_size=limit,
             )
-        query = query.filter(Image.source == source)
+        query = query.where(Image.source == source)
+
+    # Serve repeat reads from the response cache
+    cache = ResponseCacheService()
+    cache_key = await cache.list_key(
+        source, page=page, cursor=cursor, limit=limit, approximate=approximate
+    )
+    entry = await cache.get_list(cache_key)
+    if entry:
+        return conditional_response(request, entry)
 
     # Get total count
-    total = query.count()
+    total, total_exact = await ImageCountService(db).get_total(source, approximate)
 
     # Calculate pagination
     pages = (total + limit - 1) // limit if total > 0 else 0
-    offset = (page - 1) * limit
-
-    # Fetch images
-    images = (
-        query.order_by(Image.created_at.desc())
-        .offset(offset)
-        .limit(limit)
-        .all()
-    )
 
-    return ImageListResponse(
-        images=[ImageResponse.model_validate(img) for img in images],
+    # Newest first; id breaks ties between images created together
+    query = query.order_by(Image.created_at.desc(), Image.id.desc())
+    if cursor:
+        query = query.where(
+            tuple_(Image.created_at, Image.id) < decode_cursor(cursor)
+        )
+    else:
+        query = query.offset((page - 1) * limit)
+
+    # Fetch images, plus one to tell whether another page follows
+    result = await db.execute(query.limit(limit + 1))
+    images = result.all()
+
+    next_cursor = None
+    if len(images) > limit:
+        images = images[:limit]
+        next_cursor = encode_cursor(images[-1].created_at, images[-1].id)
+
+    body = encode_image_list(
+        images,
         total=total,
+        total_exact=total_exact,
         page=page,
         pages=pages,
         page_size=limit,
+        next_cursor=next_cursor,
+    )
+    entry = await cache.set_list(cache_key, body)
+    return conditional_response(request, entry)
+
+
+@router.get("/export")
+async def export_images(
+    export_format: Literal["ndjson", "csv"] = Query(
+        "ndjson", alias="format", description="Output format: 'ndjson' or 'csv'"
+    ),
+    source: Optional[str] = Query(
+        None,
+        description="Filter by source: 'google_drive' or 'dropbox'",
+    ),
+    job_id: Optional[str] = Query(None, description="Filter by import job"),
+):
+    """
+    Stream every matching image as NDJSON or CSV.
+
+    Rows are read through a server-side cursor in batches of
+    ``export_batch_size`` and written out as they arrive, so neither the
+    database nor the gateway holds the whole result, however large.
+    """
+    query = select(*(getattr(Image, field) for field in EXPORT_FIELDS)).where(
+        Image.status == "completed"
+    )
+    if source:
+        query = query.where(Image.source == source)
+    if job_id:
+        query = query.where(Image.import_job_id == job_id)
+    query = query.order_by(Image.id).execution_options(
+        yield_per=settings.export_batch_size
+    )
+
+    async def rows():
+        # The session lives as long as the stream, not the request handler
+        async with SessionLocal() as db:
+            if export_format == "csv":
+                yield encode_csv([], header=True)
+
+            result = await db.stream(query)
+            async for batch in result.partitions():
+                if export_format == "csv":
+                    yield encode_csv(batch)
+                else:
+                    yield encode_ndjson(batch)
+
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        rows(),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="images.{export_format}"'
+        },
     )
 
 
 @router.get("/{image_id}", response_model=ImageResponse)
 async def get_image(
     image_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_db),
 ):
-    """Get a single image by ID."""
-    image = db.query(Image).filter(Image.id == image_id).first()
+    """
+    Get a single image by ID.
+
+    Cached like list pages, with ``Last-Modified`` taken from the row.
+    """
+    cache = ResponseCacheService()
+    entry = await cache.get_image(image_id)
+    if entry:
+        return conditional_response(request, entry)
+
+    image = await db.get(Image, image_id)
 
     if not image:
-        from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Image not found")
 
-    return ImageResponse.model_validate(image)
+    entry = await cache.set_image(
+        image_id,
+        image.source,
+        ImageResponse.model_validate(image).model_dump_json(),
+        image.updated_at or image.created_at,
+    )
+    return conditional_response(request, entry)
@@ -1,15 +1,34 @@
+import asyncio
+import logging
 import uuid
 import re
-from datetime import datetime
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..config import get_settings
 from ..database import get_db
 from ..models import ImportJob, Image
-from ..schemas import ImportRequest, ImportResponse, JobStatusResponse
-from ..services.drive_service import GoogleDriveService
-from ..services.supabase_storage import SupabaseStorageService
+from ..schemas import (
+    ImportRequest,
+    ImportResponse,
+    JobStatusResponse,
+    JobStatusListRequest,
+    JobStatusListResponse,
+    SyncRequest,
+)
+from ..services.task_service import TaskService
+from ..services.express_import import ExpressImportService
+from ..services.response_cache import ResponseCacheService
+from ..services.progress_service import ProgressService
+from ..services.job_events import job_event_broker
 
 router = APIRouter(prefix="/import", tags=["Import"])
+settings = get_settings()
+logger = logging.getLogger(__name__)
 
 
 def extract_google_drive_folder_id(url: str) -> str:
@@ -38,101 +57,90 @@ def extract_dropbox_shared_link(url: str) -> str:
     return url
 
 
-def process_google_drive_import(
-    job_id: str,
-    folder_id: str,
-    db: Session
-) -> dict:
+async def run_express_import(
+    db: AsyncSession,
+    job: ImportJob,
+    files: List[Dict[str, Any]],
+    express: ExpressImportService,
+) -> ImportResponse:
     """
-    Process Google Drive import synchronously.
-    Downloads images and uploads to Supabase Storage.
+    Transfer a small folder's files concurrently and record them at once.
     """
-    drive_service = GoogleDriveService()
-    storage_service = SupabaseStorageService()
-
-    try:
-        # Get list of files from Google Drive folder
-        files = drive_service.get_all_files_in_folder(folder_id)
-
-        # Update job with total files
-        job = db.query(ImportJob).filter(ImportJob.id == job_id).first()
-        job.total_files = len(files)
-        job.status = "processing"
-        db.commit()
-
-        processed = 0
-        failed = 0
+    job.status = "processing"
+    job.total_files = len(files)
+    await db.commit()
+
+    results = await express.transfer_files(job.id, files)
+
+    for file_info, storage_result in zip(files, results):
+        if storage_result is None:
+            continue
+        db.add(
+            Image(
+                name=file_info["name"],
+                google_drive_id=file_info["id"],
+                source="google_drive",
+                size=int(file_info.get("size", 0)),
+                mime_type=file_info["mimeType"],
+                storage_path=storage_result["storage_path"],
+                storage_url=storage_result["storage_url"],
+                import_job_id=job.id,
+                ingest_key=f"{job.id}:{file_info['id']}",
+                status="completed",
+            )
+        )
 
-        for file_info in files:
-            try:
-                # Download file from Google Drive
-                file_content = drive_service.download_file(file_info["id"])
-
-                # Upload to Supabase Storage
-                storage_result = storage_service.upload_file(
-                    file_content=file_content,
-                    file_name=file_info["name"],
-                    mime_type=file_info["mimeType"],
-                    folder=job_id,  # Use job_id as folder for organization
-                )
-
-                # Create image record in database
-                image = Image(
-                    name=file_info["name"],
-                    google_drive_id=file_info["id"],
-                    source="google_drive",
-                    size=int(file_info.get("size", 0)),
-                    mime_type=file_info["mimeType"],
-                    storage_path=storage_result["storage_path"],
-                    storage_url=storage_result["storage_url"],
-                    import_job_id=job_id,
-                    status="completed",
-                )
-                db.add(image)
-                processed += 1
+    processed = sum(1 for r in results if r is not None)
+    job.processed_files = processed
+    job.failed_files = len(files) - processed
+    job.status = "completed" if processed == len(files) else "completed_with_errors"
+    job.completed_at = datetime.utcnow()
+    await db.commit()
 
-            except Exception as e:
-                print(f"Failed to process file {file_info['name']}: {e}")
-                failed += 1
+    if processed:
+        await ResponseCacheService().touch("google_drive")
 
-            # Update job progress
-            job.processed_files = processed
-            job.failed_files = failed
-            db.commit()
+    return ImportResponse(
+        job_id=job.id,
+        status=job.status,
+        message=f"Import completed. Processed {processed} of {len(files)} images.",
+    )
 
-        # Mark job as completed
-        job.status = "completed"
-        job.completed_at = datetime.utcnow()
-        db.commit()
 
-        return {
-            "total": len(files),
-            "processed": processed,
-            "failed": failed,
-        }
+async def queue_job(
+    db: AsyncSession, job: ImportJob, enqueue: Callable[..., None], *args: Any
+) -> None:
+    """
+    Hand a job to the workers without blocking the event loop.
 
+    Sending to the broker is blocking I/O, so it runs in the threadpool. If
+    the broker cannot take the job, the job is marked failed rather than
+    left pending forever, and the request fails with 503.
+    """
+    try:
+        await run_in_threadpool(enqueue, *args)
     except Exception as e:
-        # Mark job as failed
-        job = db.query(ImportJob).filter(ImportJob.id == job_id).first()
-        if job:
-            job.status = "failed"
-            job.error_message = str(e)
-            db.commit()
-        raise e
-
-    finally:
-        drive_service.close()
+        logger.error(f"Failed to queue job {job.id}: {e}")
+        job.status = "failed"
+        job.error_message = f"Failed to queue job: {e}"
+        await db.commit()
+        raise HTTPException(
+            status_code=503, detail="Could not queue the job, try again"
+        )
 
 
-@router.post("/google-drive", response_model=ImportResponse)
+@router.post("/google-drive", response_model=ImportResponse, status_code=202)
 async def import_from_google_drive(
     request: ImportRequest,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Import images from a public Google Drive folder.
 
-    This processes the import synchronously and returns when complete.
+    Small folders (see the express settings) are imported right away and
+    answered with 200 once done. Anything larger is queued for the worker
+    service, and the response returns as soon as the job is created.
     """
     try:
         folder_id = extract_google_drive_folder_id(request.folder_url)
@@ -145,36 +153,56 @@ async def import_from_google_drive(
         id=job_id,
         source="google_drive",
         source_url=request.folder_url,
+        source_key=folder_id,
         status="pending",
     )
     db.add(job)
-    db.commit()
-
-    try:
-        # Process import synchronously
-        result = process_google_drive_import(job_id, folder_id, db)
-
-        return ImportResponse(
-            job_id=job_id,
-            status="completed",
-            message=f"Import completed. Processed {result['processed']} of {result['total']} images.",
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Import failed: {str(e)}"
-        )
+    await db.commit()
+
+    async with ExpressImportService() as express:
+        try:
+            # Bounded so a slow listing still gets the quick 202
+            files = await asyncio.wait_for(
+                express.list_small_folder(folder_id), settings.express_listing_timeout
+            )
+        except Exception as e:
+            # Let the worker list it, with its retries
+            logger.warning(f"Express listing failed for folder {folder_id}: {e!r}")
+            files = None
+
+        if files is not None:
+            try:
+                result = await run_express_import(db, job, files, express)
+            except Exception as e:
+                # Hand the folder to the worker rather than leave the job stuck
+                logger.error(f"Express import failed for job {job_id}, queuing it: {e}")
+                await db.rollback()
+                job.status = "pending"
+                job.total_files = job.processed_files = job.failed_files = 0
+                await db.commit()
+            else:
+                response.status_code = 200
+                return result
+
+    await queue_job(db, job, TaskService().queue_google_drive_import, job_id, folder_id)
+
+    return ImportResponse(
+        job_id=job_id,
+        status="pending",
+        message="Import job queued. Use GET /import/jobs/{job_id} to track progress.",
+    )
 
 
-@router.post("/dropbox", response_model=ImportResponse)
+@router.post("/dropbox", response_model=ImportResponse, status_code=202)
 async def import_from_dropbox(
     request: ImportRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Import images from a public Dropbox folder.
 
-    Note: Dropbox import is not yet implemented in synchronous mode.
+    The import is queued for the worker service; the response returns as
+    soon as the job is created.
     """
     try:
         shared_link = extract_dropbox_shared_link(request.folder_url)
@@ -187,49 +215,268 @@ async def import_from_dropbox(
         id=job_id,
         source="dropbox",
         source_url=request.folder_url,
+        source_key=shared_link,
         status="pending",
     )
     db.add(job)
-    db.commit()
+    await db.commit()
 
-    # For now, mark as failed since Dropbox sync is not implemented
-    job.status = "failed"
-    job.error_message = "Dropbox synchronous import not yet implemented"
-    db.commit()
+    await queue_job(db, job, TaskService().queue_dropbox_import, job_id, shared_link)
 
-    raise HTTPException(
-        status_code=501,
-        detail="Dropbox import is not yet available in synchronous mode"
+    return ImportResponse(
+        job_id=job_id,
+        status="pending",
+        message="Import job queued. Use GET /import/jobs/{job_id} to track progress.",
     )
 
 
-@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
-async def get_job_status(
-    job_id: str,
-    db: Session = Depends(get_db),
+@router.post("/google-drive/sync", response_model=ImportResponse, status_code=202)
+async def sync_google_drive(
+    request: SyncRequest,
+    db: AsyncSession = Depends(get_db),
 ):
-    """Get the status of an import job."""
-    job = db.query(ImportJob).filter(ImportJob.id == job_id).first()
+    """
+    Sync a previously imported Google Drive folder.
 
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
+    Only files added or modified since the last sync are transferred, and
+    images whose files were removed are marked as deleted. With ``watch``,
+    the folder is re-synced periodically.
+    """
+    try:
+        folder_id = extract_google_drive_folder_id(request.folder_url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    progress_percent = 0.0
-    if job.total_files > 0:
-        progress_percent = round(
-            (job.processed_files / job.total_files) * 100, 2
-        )
+    job_id = str(uuid.uuid4())
+    job = ImportJob(
+        id=job_id,
+        source="google_drive",
+        source_url=request.folder_url,
+        source_key=folder_id,
+        job_type="sync",
+        status="pending",
+    )
+    db.add(job)
+    await db.commit()
+
+    await queue_job(
+        db, job, TaskService().queue_google_drive_sync, job_id, folder_id, request.watch
+    )
+
+    return ImportResponse(
+        job_id=job_id,
+        status="pending",
+        message="Sync job queued. Use GET /import/jobs/{job_id} to track progress.",
+    )
+
+
+@router.post("/dropbox/sync", response_model=ImportResponse, status_code=202)
+async def sync_dropbox(
+    request: SyncRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Sync a previously imported Dropbox folder.
+
+    Only files added or modified since the last sync are transferred, and
+    images whose files were removed are marked as deleted. With ``watch``,
+    the folder is re-synced periodically.
+    """
+    try:
+        shared_link = extract_dropbox_shared_link(request.folder_url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job_id = str(uuid.uuid4())
+    job = ImportJob(
+        id=job_id,
+        source="dropbox",
+        source_url=request.folder_url,
+        source_key=shared_link,
+        job_type="sync",
+        status="pending",
+    )
+    db.add(job)
+    await db.commit()
+
+    await queue_job(
+        db, job, TaskService().queue_dropbox_sync, job_id, shared_link, request.watch
+    )
+
+    return ImportResponse(
+        job_id=job_id,
+        status="pending",
+        message="Sync job queued. Use GET /import/jobs/{job_id} to track progress.",
+    )
+
+
+# Job states after which nothing changes any more
+FINAL_STATUSES = ("completed", "completed_with_errors", "failed")
+
+# Job states whose counters move in Redis ahead of import_jobs
+RUNNING_STATUSES = ("listing", "processing")
+
+
+def get_progress_percent(processed_files: int, total_files: int) -> float:
+    """Share of a job's files that have been imported."""
+    if total_files > 0:
+        return round((processed_files / total_files) * 100, 2)
+    return 0.0
+
+
+async def build_job_status(
+    job: ImportJob, live: Optional[Dict[str, int]] = None
+) -> JobStatusResponse:
+    """
+    Describe a job, with live counters while it runs.
+
+    Args:
+        job: The job's row
+        live: The job's live counters, if already fetched
+    """
+    # Live counters while the job runs; import_jobs lags behind them
+    counters = {
+        "total_files": job.total_files,
+        "processed_files": job.processed_files,
+        "failed_files": job.failed_files,
+    }
+    if job.status in RUNNING_STATUSES:
+        if live is None:
+            live = await ProgressService().get_progress(job.id)
+        counters = live or counters
 
     return JobStatusResponse(
         job_id=job.id,
         status=job.status,
         source=job.source,
         source_url=job.source_url,
-        total_files=job.total_files,
-        processed_files=job.processed_files,
-        failed_files=job.failed_files,
-        progress_percent=progress_percent,
+        job_type=job.job_type or "import",
+        total_files=counters["total_files"],
+        processed_files=counters["processed_files"],
+        failed_files=counters["failed_files"],
+        progress_percent=get_progress_percent(
+            counters["processed_files"], counters["total_files"]
+        ),
         error_message=job.error_message,
         created_at=job.created_at,
         completed_at=job.completed_at,
     )
+
+
+def apply_job_event(status: JobStatusResponse, event: dict) -> JobStatusResponse:
+    """Update a job's status with an event published by a worker."""
+    fields = {**status.model_dump(), **event}
+    fields["progress_percent"] = get_progress_percent(
+        fields["processed_files"], fields["total_files"]
+    )
+    return JobStatusResponse.model_validate(fields)
+
+
+@router.post("/jobs/status", response_model=JobStatusListResponse)
+async def get_job_statuses(
+    request: JobStatusListRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Get the status of many import jobs at once.
+
+    One query reads all the jobs, and one Redis round trip their live
+    counters. With ``since``, only jobs changed after that time are
+    returned; running jobs are always included, as their counters move
+    between writes to the database. Unknown job IDs are left out.
+    """
+    # updated_at is the database's now(), the start of the writing
+    # transaction; read the same clock, and step back far enough that a
+    # write still in flight now is reported on the next refresh
+    server_time = await db.scalar(select(func.clock_timestamp())) - timedelta(
+        seconds=settings.job_status_since_margin
+    )
+
+    query = select(ImportJob).where(ImportJob.id.in_(request.job_ids))
+    if request.since:
+        query = query.where(
+            or_(
+                ImportJob.updated_at > request.since,
+                ImportJob.status.in_(RUNNING_STATUSES),
+            )
+        )
+    result = await db.scalars(query)
+    jobs = result.all()
+
+    live = await ProgressService().get_progress_many(
+        [job.id for job in jobs if job.status in RUNNING_STATUSES]
+    )
+
+    return JobStatusListResponse(
+        jobs=[await build_job_status(job, live.get(job.id, {})) for job in jobs],
+        server_time=server_time,
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job_status(
+    job_id: str,
+    db: AsyncSession = Depends(get_db),
+):
+    """Get the status of an import job."""
+    job = await db.get(ImportJob, job_id)
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return await build_job_status(job)
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(
+    job_id: str,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Stream an import job's status as Server-Sent Events.
+
+    The current status is sent first, then again each time a worker
+    reports progress, until the job finishes. Updates come from Redis
+    pub/sub, so watching a job costs no database reads after the first.
+    """
+    # Subscribe before reading the job, so no update falls in between
+    queue = job_event_broker.subscribe(job_id)
+    try:
+        job = await db.get(ImportJob, job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        status = await build_job_status(job)
+    except BaseException:
+        job_event_broker.unsubscribe(job_id, queue)
+        raise
+    finally:
+        # Release the connection; the stream may stay open for a long time
+        await db.close()
+
+    async def events():
+        nonlocal status
+        try:
+            yield f"data: {status.model_dump_json()}\n\n"
+            while status.status not in FINAL_STATUSES:
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), timeout=settings.sse_keepalive_interval
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    # Comment line, keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+
+                status = apply_job_event(status, event)
+                yield f"data: {status.model_dump_json()}\n\n"
+        finally:
+            job_event_broker.unsubscribe(job_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -4,6 +4,9 @@ from .image import (
     ImportRequest,
     ImportResponse,
     JobStatusResponse,
+    JobStatusListRequest,
+    JobStatusListResponse,
+    SyncRequest,
 )
 
 __all__ = [
@@ -12,4 +15,7 @@ __all__ = [
     "ImportRequest",
     "ImportResponse",
     "JobStatusResponse",
+    "JobStatusListRequest",
+    "JobStatusListResponse",
+    "SyncRequest",
 ]
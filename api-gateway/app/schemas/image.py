@@ -9,6 +9,13 @@ class ImportRequest(BaseModel):
     folder_url: str = Field(..., description="Public folder URL from Google Drive or Dropbox")
 
 
+class SyncRequest(BaseModel):
+    """Request schema for sync endpoints."""
+
+    folder_url: str = Field(..., description="Public folder URL from Google Drive or Dropbox")
+    watch: bool = Field(False, description="Re-sync the folder periodically")
+
+
 class ImportResponse(BaseModel):
     """Response schema for import endpoints."""
 
@@ -39,9 +46,11 @@ class ImageListResponse(BaseModel):
 
     images: List[ImageResponse]
     total: int
+    total_exact: bool = True  # False when total is a planner estimate
     page: int
     pages: int
     page_size: int
+    next_cursor: Optional[str] = None  # Pass as ``cursor`` for the next page
 
 
 class JobStatusResponse(BaseModel):
@@ -51,6 +60,7 @@ class JobStatusResponse(BaseModel):
     status: str
     source: str
     source_url: str
+    job_type: str = "import"
     total_files: int
     processed_files: int
     failed_files: int
@@ -61,3 +71,20 @@ class JobStatusResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class JobStatusListRequest(BaseModel):
+    """Request schema for bulk job status."""
+
+    job_ids: List[str] = Field(..., max_length=1000, description="Jobs to report on")
+    since: Optional[datetime] = Field(
+        None,
+        description="Only return jobs changed after this time (server_time of a previous response)",
+    )
+
+
+class JobStatusListResponse(BaseModel):
+    """Response schema for bulk job status."""
+
+    jobs: List[JobStatusResponse]
+    server_time: datetime  # Pass as ``since`` on the next refresh
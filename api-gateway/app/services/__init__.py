@@ -1,5 +1,20 @@
 from .task_service import TaskService
 from .drive_service import GoogleDriveService
 from .supabase_storage import SupabaseStorageService
+from .progress_service import ProgressService
+from .express_import import ExpressImportService
+from .image_count import ImageCountService
+from .response_cache import ResponseCacheService
+from .job_events import JobEventBroker, job_event_broker
 
-__all__ = ["TaskService", "GoogleDriveService", "SupabaseStorageService"]
+__all__ = [
+    "TaskService",
+    "GoogleDriveService",
+    "SupabaseStorageService",
+    "ProgressService",
+    "ExpressImportService",
+    "ImageCountService",
+    "ResponseCacheService",
+    "JobEventBroker",
+    "job_event_broker",
+]
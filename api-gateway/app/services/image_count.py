@@ -0,0 +1,62 @@
+import json
+from typing import Optional, Tuple
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..cache import redis_client
+from ..config import get_settings
+from ..models import Image
+
+settings = get_settings()
+
+
+class ImageCountService:
+    """Service for counting listed images without a full scan per request."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_total(
+        self, source: Optional[str] = None, approximate: bool = False
+    ) -> Tuple[int, bool]:
+        """
+        Count the images a listing would show.
+
+        Exact counts are cached for ``image_count_cache_ttl`` seconds, so
+        they may trail new imports by that much. Approximate counts come
+        from Postgres planner statistics and cost no scan at all.
+
+        Returns:
+            The total and whether it is exact
+        """
+        if approximate:
+            return await self.estimate(source), False
+
+        key = f"images:count:{source or 'all'}"
+        cached = await redis_client.get(key)
+        if cached is not None:
+            return int(cached), True
+
+        query = select(func.count()).select_from(Image).where(
+            Image.status == "completed"
+        )
+        if source:
+            query = query.where(Image.source == source)
+        total = await self.db.scalar(query)
+
+        await redis_client.set(key, total, ex=settings.image_count_cache_ttl)
+        return total, True
+
+    async def estimate(self, source: Optional[str] = None) -> int:
+        """Row count the planner expects for the listing's filters."""
+        statement = "SELECT 1 FROM images WHERE status = 'completed'"
+        params = {}
+        if source:
+            statement += " AND source = :source"
+            params["source"] = source
+
+        plan = await self.db.scalar(
+            text(f"EXPLAIN (FORMAT JSON) {statement}"), params
+        )
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
@@ -0,0 +1,88 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Dict, Optional, Set
+from ..cache import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class JobEventBroker:
+    """
+    Fans job events published by the workers out to event streams.
+
+    The gateway process holds one Redis pattern subscription however many
+    clients are watching; each stream gets its own queue of events.
+    """
+
+    PATTERN = "job:*:events"
+
+    def __init__(self):
+        self.queues: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self.task: Optional[asyncio.Task] = None
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        """Start receiving a job's events."""
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+        queue = asyncio.Queue(maxsize=100)
+        self.queues[job_id].add(queue)
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue) -> None:
+        """Stop receiving a job's events."""
+        self.queues[job_id].discard(queue)
+        if not self.queues[job_id]:
+            del self.queues[job_id]
+
+    async def run(self) -> None:
+        """Relay published events until cancelled, resubscribing on errors."""
+        while True:
+            pubsub = redis_client.pubsub()
+            try:
+                await pubsub.psubscribe(self.PATTERN)
+                async for message in pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self.dispatch(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job event subscription failed: {str(e)}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    def dispatch(self, channel: bytes, data: bytes) -> None:
+        """Hand an event to every stream watching its job."""
+        job_id = channel.decode().split(":")[1]
+        if job_id not in self.queues:
+            return
+
+        event = json.loads(data)
+        for queue in self.queues[job_id]:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Collapse the backlog into one event. Events carry absolute
+                # counters, so later fields win, and nothing is dropped that
+                # a later event does not replace, the final status included
+                merged = {}
+                while not queue.empty():
+                    merged.update(queue.get_nowait())
+                merged.update(event)
+                queue.put_nowait(merged)
+
+    async def close(self) -> None:
+        """Stop relaying events."""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+
+# One broker per gateway process
+job_event_broker = JobEventBroker()
@@ -0,0 +1,44 @@
+from typing import Dict, List, Optional
+from ..cache import redis_client
+
+
+class ProgressService:
+    """Service for reading the live progress counters kept by the workers."""
+
+    async def get_progress(self, job_id: str) -> Optional[Dict[str, int]]:
+        """
+        Get a job's live file counters.
+
+        The workers count files in Redis and write the counters to
+        import_jobs only every few seconds, so these are fresher than the
+        database while a job runs.
+
+        Returns:
+            total, processed and failed counts, or None if the job has no
+            live counters (not started yet, or expired)
+        """
+        progress = await self.get_progress_many([job_id])
+        return progress.get(job_id)
+
+    async def get_progress_many(self, job_ids: List[str]) -> Dict[str, Dict[str, int]]:
+        """
+        Get the live counters of many jobs in one round trip.
+
+        Returns:
+            Counters by job ID, for the jobs that have them
+        """
+        pipe = redis_client.pipeline(transaction=False)
+        for job_id in job_ids:
+            pipe.hmget(f"job:{job_id}:progress", "total", "processed", "failed")
+        results = await pipe.execute()
+
+        progress = {}
+        for job_id, values in zip(job_ids, results):
+            if values[0] is None:
+                continue
+            progress[job_id] = {
+                "total_files": int(values[0]),
+                "processed_files": int(values[1] or 0),
+                "failed_files": int(values[2] or 0),
+            }
+        return progress
@@ -0,0 +1,121 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Optional
+from fastapi import Request, Response
+from ..cache import redis_client
+from ..config import get_settings
+
+settings = get_settings()
+
+SOURCES = ("google_drive", "dropbox")
+
+
+class ResponseCacheService:
+    """
+    Redis cache of serialized image responses.
+
+    Entries are tied to a per-source generation counter that is bumped
+    whenever rows of that source are written (by the workers or an express
+    import), so a cached response is never served after its rows changed.
+    """
+
+    async def get_generations(self) -> Dict[str, int]:
+        """Current generation of each source."""
+        values = await redis_client.mget(
+            [f"images:generation:{source}" for source in SOURCES]
+        )
+        return {source: int(value or 0) for source, value in zip(SOURCES, values)}
+
+    async def touch(self, source: str) -> None:
+        """Invalidate cached responses for a source."""
+        await redis_client.incr(f"images:generation:{source}")
+
+    async def list_key(self, source: Optional[str], **params: Any) -> str:
+        """Cache key for a list page, valid until its sources change."""
+        generations = await self.get_generations()
+        sources = [source] if source else SOURCES
+        version = ".".join(str(generations[s]) for s in sources)
+        digest = hashlib.sha256(
+            json.dumps(params, sort_keys=True).encode()
+        ).hexdigest()[:16]
+        return f"images:list:{source or 'all'}:{version}:{digest}"
+
+    async def get_list(self, key: str) -> Optional[Dict[str, str]]:
+        """Cached list page, if any."""
+        cached = await redis_client.get(key)
+        return json.loads(cached) if cached else None
+
+    async def set_list(self, key: str, body: str) -> Dict[str, str]:
+        """Cache a list page; it counts as modified now."""
+        entry = build_entry(body, datetime.now(timezone.utc))
+        await redis_client.set(key, json.dumps(entry), ex=settings.image_cache_ttl)
+        return entry
+
+    async def get_image(self, image_id: int) -> Optional[Dict[str, str]]:
+        """Cached single image, if its source has not changed since."""
+        cached = await redis_client.get(f"images:item:{image_id}")
+        if not cached:
+            return None
+
+        entry = json.loads(cached)
+        generations = await self.get_generations()
+        if entry["generation"] != generations.get(entry["source"]):
+            return None
+        return entry
+
+    async def set_image(
+        self, image_id: int, source: str, body: str, last_modified: datetime
+    ) -> Dict[str, str]:
+        """Cache a single image at its source's current generation."""
+        generations = await self.get_generations()
+        entry = build_entry(body, last_modified)
+        entry.update(source=source, generation=generations.get(source, 0))
+        await redis_client.set(
+            f"images:item:{image_id}", json.dumps(entry), ex=settings.image_cache_ttl
+        )
+        return entry
+
+
+def build_entry(body: str, last_modified: datetime) -> Dict[str, str]:
+    """Serialized response with its validators."""
+    return {
+        "body": body,
+        "etag": f'"{hashlib.sha256(body.encode()).hexdigest()[:32]}"',
+        "last_modified": format_datetime(
+            last_modified.astimezone(timezone.utc), usegmt=True
+        ),
+    }
+
+
+def conditional_response(request: Request, entry: Dict[str, str]) -> Response:
+    """
+    Answer with the cached body, or 304 if the client's copy is current.
+
+    If-None-Match takes precedence over If-Modified-Since, as in RFC 9110.
+    """
+    headers = {
+        "ETag": entry["etag"],
+        "Last-Modified": entry["last_modified"],
+        # Clients may keep the response but must revalidate it
+        "Cache-Control": "no-cache",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if "*" in tags or entry["etag"] in tags:
+            return Response(status_code=304, headers=headers)
+    elif if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+            if parsedate_to_datetime(entry["last_modified"]) <= since:
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+
+    return Response(
+        content=entry["body"], media_type="application/json", headers=headers
+    )
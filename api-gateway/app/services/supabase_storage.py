@@ -15,6 +15,36 @@ class SupabaseStorageService:
         self.bucket = settings.supabase_storage_bucket
         self.client = httpx.Client(timeout=60.0)
 
+    def prepare_upload(
+        self,
+        file_name: str,
+        mime_type: str,
+        folder: Optional[str] = None,
+    ) -> dict:
+        """
+        Choose where a file is stored and build its upload request.
+
+        Returns:
+            Dict with storage_path, storage_url, upload_url and headers
+        """
+        # Generate unique filename to avoid collisions
+        unique_id = str(uuid.uuid4())[:8]
+        safe_name = file_name.replace(" ", "_")
+        storage_path = f"{folder}/{unique_id}_{safe_name}" if folder else f"{unique_id}_{safe_name}"
+
+        return {
+            "storage_path": storage_path,
+            # Supabase Storage REST API endpoint
+            "upload_url": f"{self.supabase_url}/storage/v1/object/{self.bucket}/{storage_path}",
+            # Construct public URL
+            "storage_url": f"{self.supabase_url}/storage/v1/object/public/{self.bucket}/{storage_path}",
+            "headers": {
+                "Authorization": f"Bearer {self.service_key}",
+                "Content-Type": mime_type,
+                "x-upsert": "true",  # Overwrite if exists
+            },
+        }
+
     def upload_file(
         self,
         file_content: bytes,
@@ -34,33 +64,18 @@ class SupabaseStorageService:
         Returns:
             Dict with storage_path and storage_url
         """
-        # Generate unique filename to avoid collisions
-        unique_id = str(uuid.uuid4())[:8]
-        safe_name = file_name.replace(" ", "_")
-        storage_path = f"{folder}/{unique_id}_{safe_name}" if folder else f"{unique_id}_{safe_name}"
-
-        # Supabase Storage REST API endpoint
-        upload_url = f"{self.supabase_url}/storage/v1/object/{self.bucket}/{storage_path}"
-
-        headers = {
-            "Authorization": f"Bearer {self.service_key}",
-            "Content-Type": mime_type,
-            "x-upsert": "true",  # Overwrite if exists
-        }
+        upload = self.prepare_upload(file_name, mime_type, folder)
 
         response = self.client.post(
-            upload_url,
+            upload["upload_url"],
             content=file_content,
-            headers=headers,
+            headers=upload["headers"],
         )
         response.raise_for_status()
 
-        # Construct public URL
-        storage_url = f"{self.supabase_url}/storage/v1/object/public/{self.bucket}/{storage_path}"
-
         return {
-            "storage_path": storage_path,
-            "storage_url": storage_url,
+            "storage_path": upload["storage_path"],
+            "storage_url": upload["storage_url"],
         }
 
     def delete_file(self, storage_path: str) -> bool:
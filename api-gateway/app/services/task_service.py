@@ -42,3 +42,23 @@ class TaskService:
             args=[job_id, shared_link],
             queue="dropbox",
         )
+
+    def queue_google_drive_sync(
+        self, job_id: str, folder_id: str, watch: bool = False
+    ) -> None:
+        """Queue a Google Drive delta sync task."""
+        celery_app.send_task(
+            "worker.tasks.google_drive.sync_folder",
+            args=[job_id, folder_id, watch],
+            queue="google_drive",
+        )
+
+    def queue_dropbox_sync(
+        self, job_id: str, shared_link: str, watch: bool = False
+    ) -> None:
+        """Queue a Dropbox delta sync task."""
+        celery_app.send_task(
+            "worker.tasks.dropbox.sync_folder",
+            args=[job_id, shared_link, watch],
+            queue="dropbox",
+        )
@@ -8,37 +8,61 @@ function JobStatus({ jobId, source, onComplete }) {
 
   useEffect(() => {
     let intervalId
+    let eventSource
+    let finished = false
+
+    const handleStatus = (data) => {
+      setStatus(data)
+      setError(null)
+      setLoading(false)
+
+      // Check if job is complete
+      if (
+        data.status === 'completed' ||
+        data.status === 'completed_with_errors' ||
+        data.status === 'failed'
+      ) {
+        finished = true
+        clearInterval(intervalId)
+        eventSource?.close()
+        setTimeout(() => onComplete(), 3000) // Remove after 3 seconds
+      }
+    }
 
     const fetchStatus = async () => {
       try {
-        const data = await api.getJobStatus(jobId)
-        setStatus(data)
-        setError(null)
-
-        // Check if job is complete
-        if (
-          data.status === 'completed' ||
-          data.status === 'completed_with_errors' ||
-          data.status === 'failed'
-        ) {
-          clearInterval(intervalId)
-          setTimeout(() => onComplete(), 3000) // Remove after 3 seconds
-        }
+        handleStatus(await api.getJobStatus(jobId))
       } catch (err) {
         setError('Failed to fetch job status')
-        console.error(err)
-      } finally {
         setLoading(false)
+        console.error(err)
       }
     }
 
-    // Fetch immediately
-    fetchStatus()
+    // Fall back to polling every 2 seconds
+    const startPolling = () => {
+      fetchStatus()
+      intervalId = setInterval(fetchStatus, 2000)
+    }
 
-    // Then poll every 2 seconds
-    intervalId = setInterval(fetchStatus, 2000)
+    if (typeof EventSource === 'undefined') {
+      startPolling()
+    } else {
+      // The server pushes the status whenever the job progresses
+      eventSource = new EventSource(api.getJobEventsUrl(jobId))
+      eventSource.onmessage = (event) => handleStatus(JSON.parse(event.data))
+      eventSource.onerror = () => {
+        eventSource.close()
+        if (!finished) {
+          startPolling()
+        }
+      }
+    }
 
-    return () => clearInterval(intervalId)
+    return () => {
+      clearInterval(intervalId)
+      eventSource?.close()
+    }
   }, [jobId, onComplete])
 
   if (loading && !status) {
@@ -65,6 +89,7 @@ function JobStatus({ jobId, source, onComplete }) {
         return 'bg-yellow-100 text-yellow-800 border-yellow-200'
       case 'failed':
         return 'bg-red-100 text-red-800 border-red-200'
+      case 'listing':
       case 'processing':
         return 'bg-blue-100 text-blue-800 border-blue-200'
       default:
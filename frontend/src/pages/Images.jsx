@@ -11,6 +11,7 @@ function Images() {
     page: 1,
     pages: 1,
     total: 0,
+    totalExact: true,
     pageSize: 20,
   })
 
@@ -30,6 +31,7 @@ function Images() {
         page: response.page,
         pages: response.pages,
         total: response.total,
+        totalExact: response.total_exact,
         pageSize: response.page_size,
       })
     } catch (err) {
@@ -96,7 +98,8 @@ function Images() {
       <div className="bg-white shadow rounded-lg p-4">
         <div className="flex items-center justify-between">
           <p className="text-sm text-gray-600">
-            Showing {images.length} of {pagination.total} images
+            Showing {images.length} of {pagination.totalExact ? '' : '~'}
+            {pagination.total.toLocaleString()} images
           </p>
           {filter && (
             <span className="inline-flex items-center px-2.5 py-0.5 rounded-full text-xs font-medium bg-blue-100 text-blue-800">
@@ -33,6 +33,13 @@ const api = {
     return response.data
   },
 
+  /**
+   * Get the URL of a job's status event stream (Server-Sent Events)
+   * @param {string} jobId - The job ID to watch
+   * @returns {string} - Absolute URL for an EventSource
+   */
+  getJobEventsUrl: (jobId) => `${API_URL}/import/jobs/${jobId}/events`,
+
   /**
    * Get list of imported images
    * @param {Object} params - Query parameters
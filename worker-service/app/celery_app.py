@@ -1,5 +1,8 @@
 from celery import Celery
+from celery.signals import task_postrun, worker_process_init, worker_process_shutdown
 from .config import get_settings
+from .db import remove_session, reset_engine
+from .services.clients import init_clients, close_clients
 
 settings = get_settings()
 
@@ -11,6 +14,8 @@ celery_app = Celery(
     include=[
         "app.tasks.google_drive",
         "app.tasks.dropbox",
+        "app.tasks.sync",
+        "app.tasks.jobs",
     ],
 )
 
@@ -24,18 +29,42 @@ celery_app.conf.update(
     # Retry configuration
     task_acks_late=True,
     task_reject_on_worker_lost=True,
-    # Rate limiting
-    task_annotations={
-        "app.tasks.google_drive.*": {"rate_limit": "10/s"},
-        "app.tasks.dropbox.*": {"rate_limit": "10/s"},
-    },
+    # Provider rate limits are enforced per request by the shared
+    # Redis token buckets in services.rate_limiter, not per task here
     # Queues
     task_queues={
         "google_drive": {"exchange": "google_drive", "routing_key": "google_drive"},
         "dropbox": {"exchange": "dropbox", "routing_key": "dropbox"},
     },
     task_default_queue="google_drive",
+    # Periodic re-sync of watched folders (run `celery beat` once per cluster)
+    beat_schedule={
+        "resync-watched-folders": {
+            "task": "worker.tasks.sync.resync_watched_folders",
+            "schedule": settings.sync_check_interval,
+        },
+    },
 )
 
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """Set up pooled HTTP clients and database connections per worker process."""
+    reset_engine()
+    init_clients()
+
+
+@task_postrun.connect
+def close_task_session(**kwargs):
+    """Release the task's database session when it finishes."""
+    remove_session()
+
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    """Close the pooled HTTP clients when the worker process exits."""
+    close_clients()
+
+
 # Make app accessible for imports
 app = celery_app
@@ -13,6 +13,11 @@ class Settings(BaseSettings):
 
     # Database
     database_url: str = ""
+    db_pool_size: int = 2  # Connections per worker process; raise with --pool=threads
+    db_max_overflow: int = 2  # Extra connections allowed under load
+    db_pool_timeout: int = 30  # seconds to wait for a free connection
+    db_pool_recycle: int = 1800  # seconds before a connection is replaced
+    db_pgbouncer: bool = False  # Connecting through PgBouncer (transaction mode)
 
     # Redis
     redis_url: str = "redis://localhost:6379"
@@ -24,10 +29,84 @@ class Settings(BaseSettings):
     dropbox_access_token: str = ""
 
     # Worker settings
-    chunk_size: int = 100  # Number of files to process in each batch
+    chunk_size: int = 100  # Max number of files in each batch
+    batch_max_bytes: int = 256 * 1024 * 1024  # Target total size of a batch
+    batch_default_file_size: int = 1024 * 1024  # Assumed size when unlisted
     max_retries: int = 3
     retry_delay: int = 5  # seconds
 
+    # Transfer settings
+    stream_chunk_size: int = 1024 * 1024  # Bytes per streamed chunk
+
+    # HTTP connection pool (shared by all services in a worker process)
+    http_pool_size: int = 20  # Max open connections per process
+    http_keepalive_size: int = 20  # Max idle keep-alive connections
+    http_keepalive_expiry: float = 30.0  # seconds
+
+    # Async transfer engine: how many of a batch's files are transferred at
+    # once, with the high-concurrency setting opt-in
+    async_transfer_enabled: bool = False
+    async_transfer_concurrency: int = 100  # Max in-flight transfers per task
+    batch_transfer_concurrency: int = 8  # Max in-flight transfers with it disabled
+
+    # Segmented (parallel Range) downloads for large files
+    segmented_download_threshold: int = 64 * 1024 * 1024  # Bytes; 0 disables
+    download_segments: int = 4  # Ranges fetched in parallel
+    download_segment_size: int = 8 * 1024 * 1024  # Bytes per range
+
+    # Shared adaptive rate limits (requests per second across all workers)
+    drive_rate_limit: float = 10.0  # Starting rate
+    drive_rate_limit_max: float = 100.0
+    dropbox_rate_limit: float = 10.0
+    dropbox_rate_limit_max: float = 50.0
+    rate_limit_min: float = 0.5
+    rate_limit_increase: float = 0.5  # Added per interval while unthrottled
+    rate_limit_increase_interval: float = 1.0  # seconds
+    rate_limit_decrease_factor: float = 0.5  # Applied on 429 / Retry-After
+    rate_limit_decrease_cooldown: float = 1.0  # seconds between decreases
+    rate_limit_default_backoff: float = 1.0  # seconds, without Retry-After
+    rate_limit_max_wait: float = 30.0  # seconds a request may wait for a token
+    rate_limit_state_ttl: int = 24 * 60 * 60  # seconds
+
+    # Circuit breakers per upstream (shared by all workers)
+    circuit_failure_threshold: int = 5  # Failures within the window to open
+    circuit_failure_window: float = 30.0  # seconds
+    circuit_open_seconds: float = 30.0  # Fail fast this long before probing
+    circuit_probe_timeout: float = 60.0  # seconds a half-open probe may take
+    circuit_max_deferrals: int = 20  # Times a task is deferred before failing
+    circuit_state_ttl: int = 60 * 60  # seconds
+
+    # Write-behind image rows: workers queue rows on a Redis stream and the
+    # image writer (python -m app.writer) bulk-inserts them
+    write_behind_enabled: bool = False
+    image_stream: str = "images:ingest"
+    image_writer_group: str = "image-writers"
+    image_writer_batch_size: int = 1000  # Max rows per insert
+    image_writer_max_latency: float = 0.5  # seconds a partial batch may wait
+    image_writer_claim_idle: float = 60.0  # seconds before pending rows are reclaimed
+
+    # Live job progress counters in Redis
+    progress_flush_interval: float = 5.0  # seconds between writes to import_jobs
+    progress_ttl: int = 7 * 24 * 60 * 60  # seconds counters are kept
+
+    # Folder listing
+    traversal_concurrency: int = 8  # Folders listed in parallel
+
+    # Content-addressed storage: blobs stored once under their SHA-256
+    content_addressed_storage: bool = False
+    content_source_ttl: int = 30 * 24 * 60 * 60  # seconds checksum->hash kept
+
+    # Delta sync of previously imported folders
+    sync_interval: int = 60 * 60  # seconds between re-syncs of watched folders
+    sync_check_interval: int = 5 * 60  # seconds between due-folder checks
+    sync_clock_skew: int = 60  # seconds subtracted from sync points
+
+    # Resumable (TUS) uploads for large files
+    resumable_upload_threshold: int = 50 * 1024 * 1024  # Bytes; 0 disables
+    resumable_chunk_size: int = 6 * 1024 * 1024  # Part size required by Supabase
+    resumable_prefetch_parts: int = 2  # Parts read ahead while uploading
+    resumable_state_ttl: int = 24 * 60 * 60  # seconds, matches server expiry
+
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -0,0 +1,59 @@
+"""
+Database access shared by every task in a worker process.
+
+Each process has one engine, so its connections scale with worker
+concurrency rather than with the number of tasks. Sessions are scoped to the
+running task: every ``get_db()`` call made while a task runs returns the
+same session, which is removed (and its connection returned to the pool)
+when the task finishes.
+"""
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import NullPool
+
+from .config import get_settings
+
+settings = get_settings()
+
+
+def build_engine():
+    """Create the process's engine from the pool settings."""
+    if settings.db_pgbouncer:
+        # PgBouncer in transaction mode does the pooling; holding server
+        # connections here as well would pin them to this process
+        return create_engine(settings.database_url, poolclass=NullPool)
+
+    return create_engine(
+        settings.database_url,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=True,
+    )
+
+
+engine = build_engine()
+Session = scoped_session(
+    sessionmaker(autocommit=False, autoflush=False, bind=engine)
+)
+
+
+def get_db():
+    """Get the current task's database session."""
+    return Session()
+
+
+def remove_session():
+    """Close the current task's session and release its connection."""
+    Session.remove()
+
+
+def reset_engine():
+    """
+    Drop connections inherited from the parent process.
+
+    Called in each forked worker process; the parent's connections stay
+    open for the parent.
+    """
+    engine.dispose(close=False)
@@ -1,5 +1,17 @@
 from .drive_service import GoogleDriveService
 from .dropbox_service import DropboxService
 from .supabase_storage import SupabaseStorageService
+from .clients import (
+    get_drive_service,
+    get_dropbox_service,
+    get_storage_service,
+)
 
-__all__ = ["GoogleDriveService", "DropboxService", "SupabaseStorageService"]
+__all__ = [
+    "GoogleDriveService",
+    "DropboxService",
+    "SupabaseStorageService",
+    "get_drive_service",
+    "get_dropbox_service",
+    "get_storage_service",
+]
@@ -0,0 +1,214 @@
+import asyncio
+import random
+import time
+import httpx
+import logging
+import redis
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, Iterator
+from ..config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Responses that mean the upstream itself is failing
+FAILURE_STATUS_CODES = {500, 502, 503, 504}
+
+# Decide whether a request may go out. Returns 0 when closed (or when this
+# caller is the single probe of a half-open breaker), else seconds to wait.
+ALLOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local state = redis.call('HMGET', KEYS[1], 'opened_until', 'probe_until')
+local opened_until = tonumber(state[1]) or 0
+if opened_until == 0 then
+    return '0'
+end
+if now < opened_until then
+    return tostring(opened_until - now)
+end
+local probe_until = tonumber(state[2]) or 0
+if now < probe_until then
+    return tostring(probe_until - now)
+end
+redis.call('HSET', KEYS[1], 'probe_until', now + tonumber(ARGV[2]))
+return '0'
+"""
+
+# Count a failure in the current window; open the breaker at the threshold,
+# and re-open it straight away when a half-open probe fails.
+FAILURE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local state = redis.call('HMGET', KEYS[1], 'failures', 'window_start', 'opened_until')
+local failures = tonumber(state[1]) or 0
+local window_start = tonumber(state[2]) or now
+local opened_until = tonumber(state[3]) or 0
+
+if opened_until > 0 then
+    if now >= opened_until then
+        redis.call('HSET', KEYS[1], 'opened_until', now + tonumber(ARGV[4]), 'probe_until', 0)
+        redis.call('EXPIRE', KEYS[1], ARGV[5])
+        return 1
+    end
+    return 0
+end
+
+if now - window_start > tonumber(ARGV[3]) then
+    failures = 0
+    window_start = now
+end
+failures = failures + 1
+
+if failures >= tonumber(ARGV[2]) then
+    redis.call('HSET', KEYS[1], 'failures', failures, 'window_start', window_start,
+        'opened_until', now + tonumber(ARGV[4]), 'probe_until', 0)
+    redis.call('EXPIRE', KEYS[1], ARGV[5])
+    return 1
+end
+
+redis.call('HSET', KEYS[1], 'failures', failures, 'window_start', window_start)
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return 0
+"""
+
+# Close the breaker, unless it is open and this success came from a request
+# sent before it opened.
+SUCCESS_SCRIPT = """
+local opened_until = tonumber(redis.call('HGET', KEYS[1], 'opened_until')) or 0
+if opened_until > tonumber(ARGV[1]) then
+    return 0
+end
+return redis.call('DEL', KEYS[1])
+"""
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to an upstream that is down."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit {name} is open, retry in {retry_after:.1f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+    def countdown(self) -> float:
+        """Delay to defer work by, jittered so deferred tasks spread out."""
+        return self.retry_after * random.uniform(1.0, 1.5)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one upstream, shared by every worker through Redis.
+
+    After ``circuit_failure_threshold`` transport errors or 5xx responses
+    within ``circuit_failure_window`` seconds the breaker opens and requests
+    fail fast with CircuitOpenError. Once ``circuit_open_seconds`` have
+    passed, a single probe request is let through; its outcome closes or
+    re-opens the breaker.
+    """
+
+    def __init__(self, redis_client: redis.Redis, name: str):
+        self.redis = redis_client
+        self.name = name
+        self.key = f"circuit:{name}"
+        self._allow = redis_client.register_script(ALLOW_SCRIPT)
+        self._failure = redis_client.register_script(FAILURE_SCRIPT)
+        self._success = redis_client.register_script(SUCCESS_SCRIPT)
+
+    def check(self) -> None:
+        """Raise CircuitOpenError if requests should not be sent now."""
+        wait = float(
+            self._allow(
+                keys=[self.key],
+                args=[time.time(), settings.circuit_probe_timeout],
+            )
+        )
+        if wait > 0:
+            raise CircuitOpenError(self.name, wait)
+
+    def record_success(self) -> None:
+        self._success(keys=[self.key], args=[time.time()])
+
+    def record_failure(self) -> None:
+        opened = self._failure(
+            keys=[self.key],
+            args=[
+                time.time(),
+                settings.circuit_failure_threshold,
+                settings.circuit_failure_window,
+                settings.circuit_open_seconds,
+                settings.circuit_state_ttl,
+            ],
+        )
+        if opened:
+            logger.warning(
+                f"Circuit {self.name} opened for {settings.circuit_open_seconds}s"
+            )
+
+    def record(self, response: httpx.Response) -> None:
+        """Record the outcome of a response."""
+        if response.status_code in FAILURE_STATUS_CODES:
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def call(
+        self, send: Callable[[], httpx.Response], stream: bool = False
+    ) -> httpx.Response:
+        """
+        Send a request through the breaker.
+
+        With ``stream``, the response body has not been read yet: a healthy
+        response only counts as a success once ``read`` has consumed it.
+        """
+        self.check()
+        try:
+            response = send()
+        except httpx.TransportError as e:
+            self._charge(e)
+            raise
+        if not stream or response.status_code in FAILURE_STATUS_CODES:
+            self.record(response)
+        return response
+
+    async def acall(
+        self, send: Callable[[], Awaitable[httpx.Response]], stream: bool = False
+    ) -> httpx.Response:
+        """Async variant of ``call``."""
+        await asyncio.to_thread(self.check)
+        try:
+            response = await send()
+        except httpx.TransportError as e:
+            await asyncio.to_thread(self._charge, e)
+            raise
+        if not stream or response.status_code in FAILURE_STATUS_CODES:
+            await asyncio.to_thread(self.record, response)
+        return response
+
+    def read(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Pass a streamed body through, charging read errors to this upstream.
+
+        A download body is usually consumed inside another upstream's
+        request (the storage upload), so its errors are tagged here and that
+        upstream's breaker leaves them alone.
+        """
+        try:
+            yield from chunks
+        except httpx.TransportError as e:
+            self._charge(e)
+            raise
+        self.record_success()
+
+    async def aread(self, chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+        """Async variant of ``read``."""
+        try:
+            async for chunk in chunks:
+                yield chunk
+        except httpx.TransportError as e:
+            await asyncio.to_thread(self._charge, e)
+            raise
+        await asyncio.to_thread(self.record_success)
+
+    def _charge(self, error: httpx.TransportError) -> None:
+        """Record a transport error, unless another breaker already has."""
+        if getattr(error, "circuit", None) is None:
+            error.circuit = self.name
+            self.record_failure()
@@ -0,0 +1,105 @@
+import threading
+import httpx
+import logging
+import redis
+from typing import Optional
+from ..config import get_settings
+from .drive_service import GoogleDriveService
+from .dropbox_service import DropboxService
+from .supabase_storage import SupabaseStorageService
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Process-wide registry. Populated on worker_process_init (or lazily on first
+# use when running outside a prefork child, e.g. eager mode or the solo pool).
+_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+_redis_client: Optional[redis.Redis] = None
+_drive_service: Optional[GoogleDriveService] = None
+_dropbox_service: Optional[DropboxService] = None
+_storage_service: Optional[SupabaseStorageService] = None
+
+
+def _build_http_client() -> httpx.Client:
+    """Create the keep-alive HTTP client shared by all services."""
+    limits = httpx.Limits(
+        max_connections=settings.http_pool_size,
+        max_keepalive_connections=settings.http_keepalive_size,
+        keepalive_expiry=settings.http_keepalive_expiry,
+    )
+    return httpx.Client(timeout=30.0, limits=limits)
+
+
+def init_clients() -> None:
+    """
+    Create the shared clients for this process.
+
+    Anything inherited from a parent process across fork is discarded without
+    being closed, since its sockets still belong to the parent.
+    """
+    global _http_client, _redis_client
+    global _drive_service, _dropbox_service, _storage_service
+
+    with _lock:
+        _http_client = _build_http_client()
+        _redis_client = redis.Redis.from_url(settings.redis_url)
+        _drive_service = GoogleDriveService(
+            client=_http_client, redis_client=_redis_client
+        )
+        _dropbox_service = DropboxService(
+            client=_http_client, redis_client=_redis_client
+        )
+        _storage_service = SupabaseStorageService(
+            client=_http_client, redis_client=_redis_client
+        )
+
+    logger.info("Initialized shared clients")
+
+
+def close_clients() -> None:
+    """Close the shared clients for this process."""
+    global _http_client, _redis_client
+    global _drive_service, _dropbox_service, _storage_service
+
+    with _lock:
+        if _http_client is not None:
+            _http_client.close()
+        if _redis_client is not None:
+            _redis_client.close()
+        _http_client = None
+        _redis_client = None
+        _drive_service = None
+        _dropbox_service = None
+        _storage_service = None
+
+    logger.info("Closed shared clients")
+
+
+def _ensure_clients() -> None:
+    if _http_client is None:
+        init_clients()
+
+
+def get_redis() -> redis.Redis:
+    """Get the shared Redis client."""
+    _ensure_clients()
+    return _redis_client
+
+
+def get_drive_service() -> GoogleDriveService:
+    """Get the shared Google Drive service."""
+    _ensure_clients()
+    return _drive_service
+
+
+def get_dropbox_service() -> DropboxService:
+    """Get the shared Dropbox service."""
+    _ensure_clients()
+    return _dropbox_service
+
+
+def get_storage_service() -> SupabaseStorageService:
+    """Get the shared Supabase Storage service."""
+    _ensure_clients()
+    return _storage_service
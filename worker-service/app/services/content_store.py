@@ -0,0 +1,219 @@
+import hashlib
+import uuid
+import httpx
+import logging
+from functools import partial
+from typing import AsyncIterable, Callable, Iterable, Iterator, Optional, Union
+from ..config import get_settings
+from ..utils.streams import skip_bytes
+from .circuit_breaker import CircuitOpenError
+from .supabase_storage import SupabaseStorageService
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class ContentAddressedStore:
+    """
+    Stores file content under its SHA-256 so identical bytes are kept once.
+
+    When the hash is known before downloading (a provider-supplied SHA-256,
+    or a provider checksum seen before), an existing blob skips the transfer
+    entirely. Otherwise the content is hashed while it streams into a staging
+    object, which is then promoted to its blob path or dropped as a duplicate.
+    """
+
+    STAGING_FOLDER = "_staging"
+    BLOB_FOLDER = "blobs"
+
+    def __init__(self, storage_service: SupabaseStorageService):
+        self.storage = storage_service
+        self.redis = storage_service.redis
+
+    def blob_path(self, content_hash: str) -> str:
+        """Object path of the blob for a content hash."""
+        return f"{self.BLOB_FOLDER}/{content_hash[:2]}/{content_hash}"
+
+    def staging_path(self) -> str:
+        """A fresh object path to stream unhashed content into."""
+        return f"{self.STAGING_FOLDER}/{uuid.uuid4()}"
+
+    def lookup(
+        self,
+        content_hash: Optional[str] = None,
+        source_checksum: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Resolve a file's content hash before downloading it.
+
+        Args:
+            content_hash: SHA-256 supplied by the provider, if any
+            source_checksum: Provider-specific checksum, e.g. ``md5:<hex>``
+        """
+        if content_hash:
+            return content_hash
+        if source_checksum:
+            value = self.redis.get(self._source_key(source_checksum))
+            return value.decode() if value else None
+        return None
+
+    def remember(self, source_checksum: Optional[str], content_hash: str) -> None:
+        """Map a provider checksum to the content hash it produced."""
+        if source_checksum:
+            self.redis.set(
+                self._source_key(source_checksum),
+                content_hash,
+                ex=settings.content_source_ttl,
+            )
+
+    def result(self, content_hash: str, deduplicated: bool) -> dict:
+        """Upload result for a blob."""
+        storage_path = self.blob_path(content_hash)
+        return {
+            "storage_path": storage_path,
+            "storage_url": self.storage.get_public_url(storage_path),
+            "content_hash": content_hash,
+            "deduplicated": deduplicated,
+        }
+
+    def put(
+        self,
+        chunks: Union[Iterable[bytes], Callable[[int], Iterable[bytes]]],
+        mime_type: str,
+        size: int = 0,
+        resume_key: Optional[str] = None,
+        content_hash: Optional[str] = None,
+        source_checksum: Optional[str] = None,
+    ) -> dict:
+        """
+        Store a file by content, skipping the transfer for known blobs.
+
+        Args:
+            chunks: File content, or a callable returning it from an offset
+            mime_type: MIME type of the file
+            size: File size in bytes, if known
+            resume_key: Stable key identifying this file across retries
+            content_hash: SHA-256 supplied by the provider, if any
+            source_checksum: Provider-specific checksum, if any
+
+        Returns:
+            Dict with storage_path, storage_url, content_hash and deduplicated
+        """
+        known_hash = self.lookup(content_hash, source_checksum)
+        if known_hash and self.storage.file_exists(self.blob_path(known_hash)):
+            logger.info(f"Blob {known_hash} already stored, skipping transfer")
+            return self.result(known_hash, deduplicated=True)
+
+        if content_hash:
+            # A provider SHA-256 lets us upload straight to the blob path
+            self.storage.upload_stream(
+                chunks,
+                file_name=content_hash,
+                mime_type=mime_type,
+                size=size,
+                resume_key=resume_key,
+                storage_path=self.blob_path(content_hash),
+            )
+            return self.result(content_hash, deduplicated=False)
+
+        hasher = hashlib.sha256()
+        hashed = False
+
+        def hashed_from(offset: int) -> Iterator[bytes]:
+            # The hash needs every byte, so a resumed upload still reads the
+            # file from the start and only skips the part already uploaded
+            nonlocal hashed
+            hashed = True
+            source = chunks(0) if callable(chunks) else chunks
+            return skip_bytes(hash_chunks(source, hasher), offset)
+
+        staging_path = self.staging_path()
+        staging_path = self.storage.upload_stream(
+            hashed_from,
+            file_name=staging_path,
+            mime_type=mime_type,
+            size=size,
+            resume_key=resume_key,
+            storage_path=staging_path,
+        )["storage_path"]
+        if not hashed:
+            # An earlier attempt finished the upload; read the file to hash it
+            for _ in hashed_from(size):
+                pass
+        digest = hasher.hexdigest()
+
+        deduplicated = self.promote(staging_path, digest)
+        self.remember(source_checksum, digest)
+        return self.result(digest, deduplicated)
+
+    def promote(self, staging_path: str, content_hash: str) -> bool:
+        """
+        Move a staged object to its blob path.
+
+        Returns:
+            True if the blob already existed and the staged copy was dropped
+        """
+        blob_path = self.blob_path(content_hash)
+        if not self.storage.file_exists(blob_path):
+            if self.storage.move_file(staging_path, blob_path):
+                return False
+            # A concurrent upload of the same content may have won the race
+            if not self.storage.file_exists(blob_path):
+                raise RuntimeError(f"Failed to move {staging_path} to {blob_path}")
+
+        self.storage.delete_file(staging_path)
+        return True
+
+    async def aexists(self, client: httpx.AsyncClient, storage_path: str) -> bool:
+        """Async variant of ``file_exists``."""
+        return await self._asend_ok(
+            client, self.storage.build_head_request(storage_path, client=client)
+        )
+
+    async def apromote(
+        self, client: httpx.AsyncClient, staging_path: str, content_hash: str
+    ) -> bool:
+        """Async variant of ``promote``."""
+        blob_path = self.blob_path(content_hash)
+        if not await self.aexists(client, blob_path):
+            moved = await self._asend_ok(
+                client,
+                self.storage.build_move_request(staging_path, blob_path, client=client),
+            )
+            if moved:
+                return False
+            if not await self.aexists(client, blob_path):
+                raise RuntimeError(f"Failed to move {staging_path} to {blob_path}")
+
+        await self._asend_ok(
+            client, self.storage.build_delete_request(staging_path, client=client)
+        )
+        return True
+
+    async def _asend_ok(self, client: httpx.AsyncClient, request: httpx.Request) -> bool:
+        """Send through the storage breaker and report whether it succeeded."""
+        try:
+            response = await self.storage.breaker.acall(partial(client.send, request))
+            return response.status_code == 200
+        except CircuitOpenError:
+            # Storage is down; "no" would be the wrong answer
+            raise
+        except Exception:
+            return False
+
+    def _source_key(self, source_checksum: str) -> str:
+        return f"cas:source:{source_checksum}"
+
+
+def hash_chunks(chunks: Iterable[bytes], hasher) -> Iterator[bytes]:
+    """Pass chunks through while feeding them to ``hasher``."""
+    for chunk in chunks:
+        hasher.update(chunk)
+        yield chunk
+
+
+async def ahash_chunks(chunks: AsyncIterable[bytes], hasher) -> AsyncIterable[bytes]:
+    """Async variant of ``hash_chunks``."""
+    async for chunk in chunks:
+        hasher.update(chunk)
+        yield chunk
@@ -1,6 +1,14 @@
 import httpx
-from typing import List, Dict, Any, Optional
+import redis
+from datetime import datetime, timezone
+from functools import partial
+from typing import List, Dict, Any, Iterator, Optional, Set, Union
 from ..config import get_settings
+from .circuit_breaker import CircuitBreaker
+from .folder_traversal import FolderPage, FolderTraversal
+from .rate_limiter import RateLimiter
+from .segmented_download import SegmentedDownloader
+from ..utils import with_retry
 
 settings = get_settings()
 
@@ -21,16 +29,59 @@ class GoogleDriveService:
         "image/tiff",
     ]
 
-    def __init__(self, api_key: Optional[str] = None):
+    FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        client: Optional[httpx.Client] = None,
+        redis_client: Optional[redis.Redis] = None,
+    ):
         self.api_key = api_key or settings.google_api_key
-        self.client = httpx.Client(timeout=30.0)
+        # A shared client is owned (and closed) by whoever created it
+        self._owns_client = client is None
+        self.client = client or httpx.Client(timeout=30.0)
+        # Requests are throttled and circuit-broken fleet-wide when Redis
+        # is available
+        self.rate_limiter = None
+        self.api_breaker = None
+        self.download_breaker = None
+        if redis_client is not None:
+            self.api_breaker = CircuitBreaker(redis_client, "drive_api")
+            self.download_breaker = CircuitBreaker(redis_client, "drive_download")
+            self.rate_limiter = RateLimiter(
+                redis_client,
+                "google_drive",
+                self.api_key,
+                settings.drive_rate_limit,
+                settings.drive_rate_limit_max,
+            )
+
+    # File fields requested when listing
+    FILE_FIELDS = "id, name, mimeType, size, modifiedTime, md5Checksum, sha256Checksum"
 
+    @with_retry()
     def list_files_in_folder(
-        self, folder_id: str, page_token: Optional[str] = None
+        self,
+        folder_id: str,
+        page_token: Optional[str] = None,
+        modified_after: Optional[datetime] = None,
+        fields: str = FILE_FIELDS,
+        page_size: int = 100,
+        include_folders: bool = False,
     ) -> Dict[str, Any]:
         """
         List all image files in a public Google Drive folder.
 
+        Args:
+            folder_id: Google Drive folder ID
+            page_token: Token of the page to fetch
+            modified_after: Only list files modified after this time
+            fields: File fields to return
+            page_size: Files per page (max 1000)
+            include_folders: Also list subfolders, regardless of
+                ``modified_after``
+
         Returns:
             Dict with 'files' list and optional 'nextPageToken'
         """
@@ -41,44 +92,123 @@ class GoogleDriveService:
         mime_query = " or ".join(
             [f"mimeType = '{mt}'" for mt in self.IMAGE_MIME_TYPES]
         )
-        query += f" and ({mime_query})"
+        image_query = f"({mime_query})"
+
+        if modified_after:
+            image_query += f" and modifiedTime > '{to_rfc3339(modified_after)}'"
+
+        if include_folders:
+            # A folder's modifiedTime does not change with its contents
+            query += f" and (mimeType = '{self.FOLDER_MIME_TYPE}' or ({image_query}))"
+        else:
+            query += f" and {image_query}"
 
         params = {
             "q": query,
-            "fields": "nextPageToken, files(id, name, mimeType, size)",
-            "pageSize": 100,
+            "fields": f"nextPageToken, files({fields})",
+            "pageSize": page_size,
             "key": self.api_key,
         }
 
         if page_token:
             params["pageToken"] = page_token
 
-        response = self.client.get(f"{self.BASE_URL}/files", params=params)
+        response = self._send(
+            self.client.build_request("GET", f"{self.BASE_URL}/files", params=params)
+        )
         response.raise_for_status()
 
         return response.json()
 
-    def get_all_files_in_folder(self, folder_id: str) -> List[Dict[str, Any]]:
+    def iter_files_in_folder(
+        self, folder_id: str, modified_after: Optional[datetime] = None
+    ) -> Iterator[List[Dict[str, Any]]]:
         """
-        Get all image files in a folder, handling pagination.
+        Yield the image files in a folder and its subfolders, a page at a time.
 
-        Returns:
-            List of file metadata dicts
+        Subfolders are listed concurrently. Callers can start working on a
+        page while the rest are fetched, and each file is yielded once.
+
+        Args:
+            folder_id: Google Drive folder ID
+            modified_after: Only list files modified after this time
+
+        Yields:
+            Lists of file metadata dicts
         """
-        all_files = []
+        traversal = FolderTraversal(
+            partial(self._iter_folder_pages, modified_after=modified_after)
+        )
+        yield from traversal.pages(folder_id)
+
+    def _iter_folder_pages(
+        self,
+        folder_id: str,
+        modified_after: Optional[datetime] = None,
+        fields: str = FILE_FIELDS,
+        page_size: int = 100,
+    ) -> Iterator[FolderPage]:
+        """Yield (files, subfolder IDs) pages of a single folder."""
         page_token = None
 
         while True:
-            result = self.list_files_in_folder(folder_id, page_token)
-            files = result.get("files", [])
-            all_files.extend(files)
+            result = self.list_files_in_folder(
+                folder_id,
+                page_token,
+                modified_after=modified_after,
+                fields=fields,
+                page_size=page_size,
+                include_folders=True,
+            )
+            files = []
+            folders = []
+            for item in result.get("files", []):
+                if item.get("mimeType") == self.FOLDER_MIME_TYPE:
+                    folders.append(item["id"])
+                else:
+                    files.append(item)
+            yield files, folders
 
             page_token = result.get("nextPageToken")
             if not page_token:
                 break
 
+    def get_all_files_in_folder(
+        self, folder_id: str, modified_after: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get all image files in a folder, handling pagination.
+
+        Args:
+            folder_id: Google Drive folder ID
+            modified_after: Only list files modified after this time
+
+        Returns:
+            List of file metadata dicts
+        """
+        all_files = []
+        for files in self.iter_files_in_folder(folder_id, modified_after):
+            all_files.extend(files)
+
         return all_files
 
+    def get_all_file_ids_in_folder(self, folder_id: str) -> Set[str]:
+        """
+        Get the IDs of all image files currently in a folder and its subfolders.
+
+        Used by syncs to detect removed files; only IDs are requested so
+        pages can be large.
+        """
+        traversal = FolderTraversal(
+            partial(self._iter_folder_pages, fields="id, mimeType", page_size=1000)
+        )
+
+        file_ids = set()
+        for files in traversal.pages(folder_id):
+            file_ids.update(f["id"] for f in files)
+
+        return file_ids
+
     def download_file(self, file_id: str) -> bytes:
         """
         Download a file from Google Drive.
@@ -89,31 +219,112 @@ class GoogleDriveService:
         # For public files, we can use the direct download URL
         download_url = f"https://drive.google.com/uc?export=download&id={file_id}"
 
-        response = self.client.get(download_url, follow_redirects=True)
+        response = self._send(
+            self.client.build_request("GET", download_url),
+            breaker=self.download_breaker,
+            follow_redirects=True,
+        )
         response.raise_for_status()
 
         return response.content
 
+    def build_download_request(
+        self, file_id: str, client: Optional[Union[httpx.Client, httpx.AsyncClient]] = None
+    ) -> httpx.Request:
+        """
+        Build the download request for a file.
+
+        Args:
+            file_id: Google Drive file ID
+            client: Client to build the request with (sync or async);
+                defaults to this service's client
+
+        Returns:
+            Request to send with ``follow_redirects=True``
+        """
+        # For public files, we can use the direct download URL
+        download_url = f"https://drive.google.com/uc?export=download&id={file_id}"
+
+        return (client or self.client).build_request("GET", download_url)
+
+    def stream_file(
+        self, file_id: str, size: int = 0, start: int = 0
+    ) -> Iterator[bytes]:
+        """
+        Download a file from Google Drive as a stream of chunks.
+
+        Large files are fetched as parallel byte ranges when the server
+        supports it.
+
+        Args:
+            file_id: Google Drive file ID
+            size: File size from the listing, if known
+            start: Byte offset to start from
+
+        Yields:
+            Chunks of the file content, in order
+        """
+        downloader = SegmentedDownloader(
+            self.client, rate_limiter=self.rate_limiter, breaker=self.download_breaker
+        )
+        yield from downloader.stream(
+            partial(self.build_download_request, file_id),
+            size=size,
+            start=start,
+            follow_redirects=True,
+        )
+
     def get_file_metadata(self, file_id: str) -> Dict[str, Any]:
         """Get metadata for a specific file."""
         params = {
-            "fields": "id, name, mimeType, size",
+            "fields": self.FILE_FIELDS,
             "key": self.api_key,
         }
 
-        response = self.client.get(
-            f"{self.BASE_URL}/files/{file_id}", params=params
+        response = self._send(
+            self.client.build_request(
+                "GET", f"{self.BASE_URL}/files/{file_id}", params=params
+            )
         )
         response.raise_for_status()
 
         return response.json()
 
+    def _send(
+        self,
+        request: httpx.Request,
+        breaker: Optional[CircuitBreaker] = None,
+        **kwargs,
+    ) -> httpx.Response:
+        """Send a request through its upstream's circuit breaker."""
+        breaker = breaker or self.api_breaker
+        if breaker:
+            return breaker.call(partial(self._send_limited, request, **kwargs))
+        return self._send_limited(request, **kwargs)
+
+    def _send_limited(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        """Send a request within the shared rate limit for this credential."""
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        response = self.client.send(request, **kwargs)
+        if self.rate_limiter:
+            self.rate_limiter.observe(response)
+        return response
+
     def close(self):
-        """Close the HTTP client."""
-        self.client.close()
+        """Close the HTTP client if this service created it."""
+        if self._owns_client:
+            self.client.close()
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
+
+
+def to_rfc3339(value: datetime) -> str:
+    """Format a datetime for a Drive query; naive values are taken as UTC."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y-%m-%dT%H:%M:%S") + "Z"
@@ -1,6 +1,13 @@
 import httpx
-from typing import List, Dict, Any, Optional
+import redis
+from functools import partial
+from typing import List, Dict, Any, Iterator, Optional, Union
 from ..config import get_settings
+from .circuit_breaker import CircuitBreaker
+from .folder_traversal import FolderPage, FolderTraversal
+from .rate_limiter import RateLimiter
+from .segmented_download import SegmentedDownloader
+from ..utils import with_retry
 
 settings = get_settings()
 
@@ -15,13 +22,73 @@ class DropboxService:
     # Image extensions we support
     IMAGE_EXTENSIONS = [".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp", ".tiff"]
 
-    def __init__(self, access_token: Optional[str] = None):
+    def __init__(
+        self,
+        access_token: Optional[str] = None,
+        client: Optional[httpx.Client] = None,
+        redis_client: Optional[redis.Redis] = None,
+    ):
         self.access_token = access_token or settings.dropbox_access_token
         self.headers = {
             "Authorization": f"Bearer {self.access_token}",
             "Content-Type": "application/json",
         }
-        self.client = httpx.Client(timeout=30.0)
+        # A shared client is owned (and closed) by whoever created it
+        self._owns_client = client is None
+        self.client = client or httpx.Client(timeout=30.0)
+        # Requests are throttled and circuit-broken fleet-wide when Redis
+        # is available
+        self.rate_limiter = None
+        self.api_breaker = None
+        self.content_breaker = None
+        if redis_client is not None:
+            self.api_breaker = CircuitBreaker(redis_client, "dropbox_api")
+            self.content_breaker = CircuitBreaker(redis_client, "dropbox_content")
+            self.rate_limiter = RateLimiter(
+                redis_client,
+                "dropbox",
+                self.access_token,
+                settings.dropbox_rate_limit,
+                settings.dropbox_rate_limit_max,
+            )
+
+    def iter_shared_folder_files(
+        self, shared_link: str, path: str = ""
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield the image files in a shared Dropbox folder one page at a time.
+
+        Subfolders are listed concurrently rather than through a single
+        recursive cursor, and each file is yielded once.
+
+        Args:
+            shared_link: The shared folder URL
+            path: Relative path within the shared folder
+
+        Yields:
+            Lists of file metadata
+        """
+        traversal = FolderTraversal(
+            partial(self._iter_folder_pages, shared_link),
+            file_key=lambda entry: entry.get("id") or entry.get("path_lower", ""),
+        )
+        yield from traversal.pages(path)
+
+    def _iter_folder_pages(
+        self, shared_link: str, path: str
+    ) -> Iterator[FolderPage]:
+        """Yield (image files, subfolder paths) pages of a single folder."""
+        for data in self._list_folder_pages(shared_link, path, recursive=False):
+            files = []
+            folders = []
+            for entry in data.get("entries", []):
+                if entry.get(".tag") == "folder":
+                    folders.append(
+                        entry.get("path_lower") or f"{path}/{entry['name']}".lower()
+                    )
+                elif self.is_image(entry):
+                    files.append(entry)
+            yield files, folders
 
     def list_shared_folder_files(
         self, shared_link: str, path: str = ""
@@ -37,46 +104,73 @@ class DropboxService:
             List of file metadata
         """
         all_files = []
+        for files in self.iter_shared_folder_files(shared_link, path):
+            all_files.extend(files)
+
+        return all_files
+
+    def is_image(self, entry: Dict[str, Any]) -> bool:
+        """Whether a listing entry is a supported image file."""
+        if entry.get(".tag") != "file":
+            return False
+        name = entry.get("name", "").lower()
+        return any(name.endswith(ext) for ext in self.IMAGE_EXTENSIONS)
+
+    def _list_folder_pages(
+        self,
+        shared_link: str,
+        path: str = "",
+        cursor: Optional[str] = None,
+        recursive: bool = True,
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield raw list_folder result pages, following the cursor."""
         has_more = True
-        cursor = None
 
         while has_more:
-            if cursor:
-                # Continue listing with cursor
-                response = self.client.post(
+            data = self._list_folder_page(shared_link, path, cursor, recursive)
+            yield data
+
+            has_more = data.get("has_more", False)
+            cursor = data.get("cursor")
+
+    @with_retry()
+    def _list_folder_page(
+        self,
+        shared_link: str,
+        path: str = "",
+        cursor: Optional[str] = None,
+        recursive: bool = True,
+    ) -> Dict[str, Any]:
+        """Fetch one list_folder result page."""
+        if cursor:
+            # Continue listing with cursor
+            response = self._send(
+                self.client.build_request(
+                    "POST",
                     f"{self.API_URL}/files/list_folder/continue",
                     headers=self.headers,
                     json={"cursor": cursor},
                 )
-            else:
-                # Initial listing
-                response = self.client.post(
+            )
+        else:
+            # Initial listing
+            response = self._send(
+                self.client.build_request(
+                    "POST",
                     f"{self.API_URL}/files/list_folder",
                     headers=self.headers,
                     json={
                         "path": path,
                         "shared_link": {"url": shared_link},
-                        "recursive": True,
+                        "recursive": recursive,
                         "include_media_info": True,
                         "limit": 100,
                     },
                 )
+            )
 
-            response.raise_for_status()
-            data = response.json()
-
-            # Filter for image files
-            entries = data.get("entries", [])
-            for entry in entries:
-                if entry.get(".tag") == "file":
-                    name = entry.get("name", "").lower()
-                    if any(name.endswith(ext) for ext in self.IMAGE_EXTENSIONS):
-                        all_files.append(entry)
-
-            has_more = data.get("has_more", False)
-            cursor = data.get("cursor")
-
-        return all_files
+        response.raise_for_status()
+        return response.json()
 
     def download_shared_file(self, shared_link: str, path: str) -> bytes:
         """
@@ -99,28 +193,115 @@ class DropboxService:
             }),
         }
 
-        response = self.client.post(
-            f"{self.CONTENT_URL}/sharing/get_shared_link_file",
-            headers=headers,
+        response = self._send(
+            self.client.build_request(
+                "POST",
+                f"{self.CONTENT_URL}/sharing/get_shared_link_file",
+                headers=headers,
+            ),
+            breaker=self.content_breaker,
         )
         response.raise_for_status()
 
         return response.content
 
+    def build_download_request(
+        self,
+        shared_link: str,
+        path: str,
+        client: Optional[Union[httpx.Client, httpx.AsyncClient]] = None,
+    ) -> httpx.Request:
+        """
+        Build the download request for a file in a shared folder.
+
+        Args:
+            shared_link: The shared folder URL
+            path: Path to the file within the shared folder
+            client: Client to build the request with (sync or async);
+                defaults to this service's client
+        """
+        import json
+
+        headers = {
+            "Authorization": f"Bearer {self.access_token}",
+            "Dropbox-API-Arg": json.dumps({
+                "url": shared_link,
+                "path": path,
+            }),
+        }
+
+        return (client or self.client).build_request(
+            "POST",
+            f"{self.CONTENT_URL}/sharing/get_shared_link_file",
+            headers=headers,
+        )
+
+    def stream_shared_file(
+        self, shared_link: str, path: str, size: int = 0, start: int = 0
+    ) -> Iterator[bytes]:
+        """
+        Download a file from a shared Dropbox link as a stream of chunks.
+
+        Large files are fetched as parallel byte ranges when the server
+        supports it.
+
+        Args:
+            shared_link: The shared folder URL
+            path: Path to the file within the shared folder
+            size: File size from the listing, if known
+            start: Byte offset to start from
+
+        Yields:
+            Chunks of the file content, in order
+        """
+        downloader = SegmentedDownloader(
+            self.client, rate_limiter=self.rate_limiter, breaker=self.content_breaker
+        )
+        yield from downloader.stream(
+            partial(self.build_download_request, shared_link, path),
+            size=size,
+            start=start,
+        )
+
     def get_shared_link_metadata(self, shared_link: str) -> Dict[str, Any]:
         """Get metadata for a shared link."""
-        response = self.client.post(
-            f"{self.API_URL}/sharing/get_shared_link_metadata",
-            headers=self.headers,
-            json={"url": shared_link},
+        response = self._send(
+            self.client.build_request(
+                "POST",
+                f"{self.API_URL}/sharing/get_shared_link_metadata",
+                headers=self.headers,
+                json={"url": shared_link},
+            )
         )
         response.raise_for_status()
 
         return response.json()
 
+    def _send(
+        self,
+        request: httpx.Request,
+        breaker: Optional[CircuitBreaker] = None,
+        **kwargs,
+    ) -> httpx.Response:
+        """Send a request through its upstream's circuit breaker."""
+        breaker = breaker or self.api_breaker
+        if breaker:
+            return breaker.call(partial(self._send_limited, request, **kwargs))
+        return self._send_limited(request, **kwargs)
+
+    def _send_limited(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        """Send a request within the shared rate limit for this credential."""
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        response = self.client.send(request, **kwargs)
+        if self.rate_limiter:
+            self.rate_limiter.observe(response)
+        return response
+
     def close(self):
-        """Close the HTTP client."""
-        self.client.close()
+        """Close the HTTP client if this service created it."""
+        if self._owns_client:
+            self.client.close()
 
     def __enter__(self):
         return self
@@ -0,0 +1,116 @@
+import queue
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from ..config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# One listing page: the files in it and the subfolders it names
+FolderPage = Tuple[List[Dict[str, Any]], List[str]]
+
+
+class FolderTraversal:
+    """
+    Lists a folder tree with a bounded pool of concurrent listers.
+
+    Each folder is listed by one worker thread; subfolders found on its pages
+    are scheduled as soon as they are seen, so wide trees are listed in
+    parallel rather than one folder after another. Files from all folders
+    come out as a single stream of pages, each file at most once.
+    """
+
+    def __init__(
+        self,
+        list_folder: Callable[[str], Iterable[FolderPage]],
+        concurrency: Optional[int] = None,
+        file_key: Callable[[Dict[str, Any]], str] = lambda f: f["id"],
+    ):
+        """
+        Args:
+            list_folder: Yields the (files, subfolders) pages of one folder
+            concurrency: Max folders listed at once
+            file_key: Identity of a file, used to drop duplicates
+        """
+        self.list_folder = list_folder
+        self.concurrency = concurrency or settings.traversal_concurrency
+        self.file_key = file_key
+
+    def pages(self, root: str) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield pages of files from ``root`` and everything below it.
+
+        Pages arrive in whatever order the listers produce them, and
+        listers wait while ``concurrency`` pages are waiting to be consumed,
+        so memory stays bounded however large the tree is. Stopping
+        iteration early, or a lister failing, cancels folders not yet started
+        and tells running listers to stop before their next request.
+        """
+        results = queue.Queue(maxsize=self.concurrency)
+        stop = threading.Event()
+        seen_folders = {root}
+        seen_files = set()
+        pending = 0
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+
+        def schedule(folder: str):
+            nonlocal pending
+            pending += 1
+            executor.submit(self._list, folder, results, stop)
+
+        schedule(root)
+        try:
+            while pending:
+                kind, payload = results.get()
+                if kind == "done":
+                    pending -= 1
+                    continue
+                if kind == "error":
+                    raise payload
+
+                files, subfolders = payload
+                for folder in subfolders:
+                    if folder not in seen_folders:
+                        seen_folders.add(folder)
+                        schedule(folder)
+
+                new_files = []
+                for file_info in files:
+                    key = self.file_key(file_info)
+                    if key not in seen_files:
+                        seen_files.add(key)
+                        new_files.append(file_info)
+                if new_files:
+                    yield new_files
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _list(self, folder: str, results: queue.Queue, stop: threading.Event):
+        """List one folder, reporting its pages to the consumer."""
+        try:
+            if stop.is_set():
+                return
+            for page in self.list_folder(folder):
+                if not self._put(results, ("page", page), stop):
+                    return
+        except Exception as e:
+            logger.error(f"Error listing folder {folder}: {str(e)}")
+            self._put(results, ("error", e), stop)
+        finally:
+            self._put(results, ("done", None), stop)
+
+    @staticmethod
+    def _put(
+        results: queue.Queue, item: Tuple[str, Any], stop: threading.Event
+    ) -> bool:
+        """Wait for room in the results queue; False once iteration stopped."""
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import time
+import httpx
+import logging
+import redis
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from ..config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Status codes that mean "slow down"
+THROTTLE_STATUS_CODES = {429, 503}
+
+# Take tokens from the bucket, or report how long to wait for them.
+# The rate creeps up by one step per interval while requests keep flowing
+# (additive increase); a throttled response blocks the bucket until its
+# Retry-After has passed. The bucket holds at least one request's worth of
+# tokens, so rates below one per second still let requests through.
+ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local requested = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'rate', 'tokens', 'updated_at', 'increased_at', 'blocked_until')
+local rate = tonumber(state[1]) or tonumber(ARGV[3])
+local updated_at = tonumber(state[3]) or now
+local increased_at = tonumber(state[4]) or now
+local blocked_until = tonumber(state[5]) or 0
+
+if blocked_until > now then
+    return tostring(blocked_until - now)
+end
+
+if now - increased_at >= tonumber(ARGV[6]) then
+    rate = math.min(tonumber(ARGV[4]), rate + tonumber(ARGV[5]))
+    increased_at = now
+end
+
+local capacity = math.max(rate, requested)
+local tokens = tonumber(state[2]) or capacity
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = (requested - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'rate', rate, 'tokens', tokens, 'updated_at', now, 'increased_at', increased_at)
+redis.call('EXPIRE', KEYS[1], ARGV[7])
+return tostring(wait)
+"""
+
+# Cut the rate (multiplicative decrease, at most once per cooldown so a burst
+# of in-flight 429s counts as one signal) and block until Retry-After.
+THROTTLE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local retry_after = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'rate', 'decreased_at', 'blocked_until')
+local rate = tonumber(state[1]) or tonumber(ARGV[3])
+local decreased_at = tonumber(state[2]) or 0
+local blocked_until = math.max(tonumber(state[3]) or 0, now + retry_after)
+
+if now - decreased_at >= tonumber(ARGV[6]) then
+    rate = math.max(tonumber(ARGV[4]), rate * tonumber(ARGV[5]))
+    decreased_at = now
+end
+
+redis.call('HSET', KEYS[1], 'rate', rate, 'tokens', 0, 'updated_at', blocked_until,
+    'increased_at', blocked_until, 'decreased_at', decreased_at, 'blocked_until', blocked_until)
+redis.call('EXPIRE', KEYS[1], ARGV[7])
+return tostring(rate)
+"""
+
+
+class RateLimitExceeded(Exception):
+    """Raised when waiting for the shared rate limit would take too long."""
+
+    def __init__(self, key: str, retry_after: float):
+        super().__init__(f"Rate limit {key} exhausted, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """
+    Token bucket in Redis shared by every worker using the same credential.
+
+    The rate adapts to the provider (AIMD): it rises slowly while requests
+    succeed and halves when the provider throttles, so the fleet as a whole
+    settles at the provider's actual quota.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        provider: str,
+        credential: str,
+        rate: float,
+        max_rate: float,
+    ):
+        """
+        Args:
+            redis_client: Redis holding the shared bucket
+            provider: Upstream API name
+            credential: API key or token; each has its own quota
+            rate: Starting requests per second for a new bucket
+            max_rate: Ceiling the rate probes up to
+        """
+        self.redis = redis_client
+        self.key = f"ratelimit:{provider}:{credential_id(credential)}"
+        self.rate = rate
+        self.max_rate = max_rate
+        self._acquire = redis_client.register_script(ACQUIRE_SCRIPT)
+        self._throttle = redis_client.register_script(THROTTLE_SCRIPT)
+
+    def try_acquire(self, tokens: int = 1) -> float:
+        """
+        Take tokens if available.
+
+        Returns:
+            0 if the tokens were taken, else seconds to wait before retrying
+        """
+        wait = self._acquire(
+            keys=[self.key],
+            args=[
+                time.time(),
+                tokens,
+                self.rate,
+                self.max_rate,
+                settings.rate_limit_increase,
+                settings.rate_limit_increase_interval,
+                settings.rate_limit_state_ttl,
+            ],
+        )
+        return float(wait)
+
+    def acquire(self, tokens: int = 1) -> None:
+        """Block until tokens are available."""
+        deadline = time.monotonic() + settings.rate_limit_max_wait
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimitExceeded(self.key, wait)
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int = 1) -> None:
+        """Async variant of ``acquire``."""
+        deadline = time.monotonic() + settings.rate_limit_max_wait
+        while True:
+            wait = await asyncio.to_thread(self.try_acquire, tokens)
+            if wait <= 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimitExceeded(self.key, wait)
+            await asyncio.sleep(wait)
+
+    def throttled(self, retry_after: Optional[float] = None) -> None:
+        """Report that the provider throttled a request."""
+        if retry_after is None:
+            retry_after = settings.rate_limit_default_backoff
+
+        rate = self._throttle(
+            keys=[self.key],
+            args=[
+                time.time(),
+                retry_after,
+                self.rate,
+                settings.rate_limit_min,
+                settings.rate_limit_decrease_factor,
+                settings.rate_limit_decrease_cooldown,
+                settings.rate_limit_state_ttl,
+            ],
+        )
+        logger.warning(
+            f"Throttled by {self.key}, pausing {retry_after:.1f}s at {float(rate):.2f}/s"
+        )
+
+    def observe(self, response: httpx.Response) -> None:
+        """Feed a provider response back into the limiter."""
+        if response.status_code in THROTTLE_STATUS_CODES:
+            self.throttled(get_retry_after(response))
+
+    async def aobserve(self, response: httpx.Response) -> None:
+        """Async variant of ``observe``."""
+        if response.status_code in THROTTLE_STATUS_CODES:
+            await asyncio.to_thread(self.throttled, get_retry_after(response))
+
+
+def credential_id(credential: str) -> str:
+    """Stable, non-secret identifier for a credential."""
+    return hashlib.sha256(credential.encode()).hexdigest()[:16]
+
+
+def get_retry_after(response: httpx.Response) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
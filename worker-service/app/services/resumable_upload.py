@@ -0,0 +1,216 @@
+import base64
+import queue
+import threading
+import httpx
+import logging
+from functools import partial
+from typing import Callable, Iterable, Iterator, Optional, Union
+import redis
+from ..config import get_settings
+from ..utils.streams import skip_bytes
+from .circuit_breaker import CircuitBreaker
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+TUS_VERSION = "1.0.0"
+
+
+class ResumableUpload:
+    """
+    Chunked upload through Supabase Storage's resumable (TUS) endpoint.
+
+    The upload URL, object path and last acknowledged offset are persisted in
+    Redis under ``resume_key``, so a retried task continues from the last part
+    the server accepted instead of starting over. The TUS server accepts parts
+    strictly in order, so parallelism comes from reading the next parts from
+    the source while the current one is being sent.
+    """
+
+    def __init__(
+        self,
+        client: httpx.Client,
+        redis_client: redis.Redis,
+        supabase_url: str,
+        service_key: str,
+        bucket: str,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.client = client
+        self.breaker = breaker
+        self.redis = redis_client
+        self.endpoint = f"{supabase_url}/storage/v1/upload/resumable"
+        self.service_key = service_key
+        self.bucket = bucket
+
+    def upload(
+        self,
+        chunks: Union[Iterable[bytes], Callable[[int], Iterable[bytes]]],
+        storage_path: str,
+        mime_type: str,
+        size: int,
+        resume_key: str,
+    ) -> str:
+        """
+        Upload a stream of ``size`` bytes, resuming a previous attempt if any.
+
+        Args:
+            chunks: Source byte chunks starting at offset 0, or a callable
+                returning the chunks from a given byte offset so a resumed
+                upload does not download the acknowledged bytes again
+            storage_path: Object path to use for a new upload
+            mime_type: MIME type of the file
+            size: Total file size in bytes
+            resume_key: Stable key identifying this file across retries
+
+        Returns:
+            The object path (the original one when resuming)
+        """
+        state_key = f"upload:{resume_key}"
+        upload_url, storage_path, offset = self._resume_or_create(
+            state_key, storage_path, mime_type, size
+        )
+
+        if offset:
+            logger.info(f"Resuming upload of {storage_path} at byte {offset}")
+
+        if offset < size:
+            if callable(chunks):
+                chunks = chunks(offset)
+            else:
+                chunks = skip_bytes(chunks, offset)
+
+            parts = _prefetch(
+                _regroup(chunks, settings.resumable_chunk_size),
+                settings.resumable_prefetch_parts,
+            )
+            for part in parts:
+                offset = self._send_part(upload_url, offset, part)
+                self.redis.hset(state_key, "offset", offset)
+
+        if offset != size:
+            raise ValueError(
+                f"Upload of {storage_path} ended at byte {offset} of {size}"
+            )
+
+        self.redis.delete(state_key)
+        return storage_path
+
+    def _resume_or_create(
+        self, state_key: str, storage_path: str, mime_type: str, size: int
+    ):
+        """Return (upload_url, storage_path, offset) for this upload."""
+        state = self.redis.hgetall(state_key)
+        if state:
+            upload_url = state[b"url"].decode()
+            response = self._send("HEAD", upload_url, headers=self._headers())
+            if response.status_code == 200:
+                # The server's offset is authoritative
+                offset = int(response.headers["Upload-Offset"])
+                return upload_url, state[b"storage_path"].decode(), offset
+            # Expired or unknown upload: start over
+            self.redis.delete(state_key)
+
+        metadata = {
+            "bucketName": self.bucket,
+            "objectName": storage_path,
+            "contentType": mime_type,
+        }
+        headers = {
+            **self._headers(),
+            "Upload-Length": str(size),
+            "Upload-Metadata": ",".join(
+                f"{key} {base64.b64encode(value.encode()).decode()}"
+                for key, value in metadata.items()
+            ),
+            "x-upsert": "true",  # Overwrite if exists
+        }
+        response = self._send("POST", self.endpoint, headers=headers)
+        response.raise_for_status()
+
+        upload_url = httpx.URL(self.endpoint).join(response.headers["Location"])
+        self.redis.hset(
+            state_key,
+            mapping={
+                "url": str(upload_url),
+                "storage_path": storage_path,
+                "offset": 0,
+            },
+        )
+        self.redis.expire(state_key, settings.resumable_state_ttl)
+
+        return str(upload_url), storage_path, 0
+
+    def _send_part(self, upload_url: str, offset: int, part: bytes) -> int:
+        """Send one part and return the new acknowledged offset."""
+        headers = {
+            **self._headers(),
+            "Upload-Offset": str(offset),
+            "Content-Type": "application/offset+octet-stream",
+        }
+        response = self._send("PATCH", upload_url, content=part, headers=headers)
+        response.raise_for_status()
+        return int(response.headers["Upload-Offset"])
+
+    def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request through the storage circuit breaker, if any."""
+        send = partial(self.client.request, method, url, **kwargs)
+        return self.breaker.call(send) if self.breaker else send()
+
+    def _headers(self) -> dict:
+        return {
+            "Authorization": f"Bearer {self.service_key}",
+            "Tus-Resumable": TUS_VERSION,
+        }
+
+
+def _regroup(chunks: Iterable[bytes], part_size: int) -> Iterator[bytes]:
+    """Re-slice a chunk stream into parts of exactly ``part_size`` bytes."""
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer.extend(chunk)
+        while len(buffer) >= part_size:
+            yield bytes(buffer[:part_size])
+            del buffer[:part_size]
+    if buffer:
+        yield bytes(buffer)
+
+
+def _prefetch(parts: Iterator[bytes], depth: int) -> Iterator[bytes]:
+    """Read up to ``depth`` parts ahead on a background thread."""
+    buffer: queue.Queue = queue.Queue(maxsize=max(depth, 1))
+    done = object()
+    stop = threading.Event()
+    error: list = []
+
+    def put(item) -> bool:
+        # Give up once the consumer has gone away
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for part in parts:
+                if not put(part):
+                    return
+        except Exception as e:
+            error.append(e)
+        put(done)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            part = buffer.get()
+            if part is done:
+                break
+            yield part
+        if error:
+            raise error[0]
+    finally:
+        stop.set()
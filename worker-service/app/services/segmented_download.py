@@ -0,0 +1,205 @@
+import re
+import httpx
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Iterator, Optional, Tuple
+from ..config import get_settings
+from ..utils.streams import skip_bytes
+from .circuit_breaker import CircuitBreaker
+from .rate_limiter import RateLimiter
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+CONTENT_RANGE_TOTAL = re.compile(r"bytes \d+-\d+/(\d+)")
+
+
+class SegmentedDownloader:
+    """
+    Downloads large files as several HTTP Range requests in parallel.
+
+    Segments are yielded strictly in order, and at most ``segments`` of them
+    are held in memory at once. Servers that ignore the Range header are read
+    as a single stream instead.
+    """
+
+    def __init__(
+        self,
+        client: httpx.Client,
+        segments: Optional[int] = None,
+        segment_size: Optional[int] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.client = client
+        self.segments = segments or settings.download_segments
+        self.segment_size = segment_size or settings.download_segment_size
+        self.rate_limiter = rate_limiter
+        self.breaker = breaker
+
+    def stream(
+        self,
+        build_request: Callable[[], httpx.Request],
+        size: int = 0,
+        start: int = 0,
+        follow_redirects: bool = False,
+    ) -> Iterator[bytes]:
+        """
+        Stream a file's content from byte ``start`` onwards.
+
+        Args:
+            build_request: Builds a fresh download request for the file
+            size: File size from the listing; segmentation is used when the
+                remaining bytes reach ``settings.segmented_download_threshold``
+            start: Byte offset to start from
+            follow_redirects: Whether the download URL redirects
+        """
+        threshold = settings.segmented_download_threshold
+        if self.segments > 1 and threshold > 0 and size - start >= threshold:
+            chunks = self._stream_segments(build_request, size, start, follow_redirects)
+        else:
+            chunks = self._stream_single(build_request, start, follow_redirects)
+
+        # The caller is usually uploading these chunks; read errors belong to
+        # the source, and only a fully read file counts as a healthy download
+        if self.breaker:
+            chunks = self.breaker.read(chunks)
+        yield from chunks
+
+    def _stream_single(
+        self,
+        build_request: Callable[[], httpx.Request],
+        start: int,
+        follow_redirects: bool,
+    ) -> Iterator[bytes]:
+        request = build_request()
+        if start:
+            request.headers["Range"] = f"bytes={start}-"
+
+        response = self._send(request, follow_redirects)
+        try:
+            response.raise_for_status()
+            yield from self._read_from(response, start)
+        finally:
+            response.close()
+
+    def _stream_segments(
+        self,
+        build_request: Callable[[], httpx.Request],
+        size: int,
+        start: int,
+        follow_redirects: bool,
+    ) -> Iterator[bytes]:
+        # The first segment doubles as the range-support probe
+        first = (start, min(start + self.segment_size, size) - 1)
+        probe = self._send_range(build_request, first, follow_redirects)
+        try:
+            probe.raise_for_status()
+            if probe.status_code != 206:
+                logger.info("Server ignored Range header, using a single stream")
+                yield from self._read_from(probe, start)
+                return
+
+            # Trust the server's total over the listing's size
+            match = CONTENT_RANGE_TOTAL.match(probe.headers.get("Content-Range", ""))
+            if match:
+                size = int(match.group(1))
+            yield probe.read()
+        finally:
+            probe.close()
+
+        ranges = iter(
+            (offset, min(offset + self.segment_size, size) - 1)
+            for offset in range(first[1] + 1, size, self.segment_size)
+        )
+
+        with ThreadPoolExecutor(max_workers=self.segments) as pool:
+            pending = deque()
+
+            def submit_next() -> None:
+                byte_range = next(ranges, None)
+                if byte_range is not None:
+                    pending.append(
+                        pool.submit(
+                            self._fetch_range,
+                            build_request,
+                            byte_range,
+                            follow_redirects,
+                        )
+                    )
+
+            for _ in range(self.segments):
+                submit_next()
+
+            try:
+                while pending:
+                    data = pending.popleft().result()
+                    submit_next()
+                    yield data
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def _send_range(
+        self,
+        build_request: Callable[[], httpx.Request],
+        byte_range: Tuple[int, int],
+        follow_redirects: bool,
+    ) -> httpx.Response:
+        request = build_request()
+        request.headers["Range"] = f"bytes={byte_range[0]}-{byte_range[1]}"
+        return self._send(request, follow_redirects)
+
+    def _send(self, request: httpx.Request, follow_redirects: bool) -> httpx.Response:
+        if self.breaker:
+            return self.breaker.call(
+                partial(self._send_limited, request, follow_redirects), stream=True
+            )
+        return self._send_limited(request, follow_redirects)
+
+    def _send_limited(
+        self, request: httpx.Request, follow_redirects: bool
+    ) -> httpx.Response:
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        response = self.client.send(
+            request, stream=True, follow_redirects=follow_redirects
+        )
+        if self.rate_limiter:
+            self.rate_limiter.observe(response)
+        return response
+
+    def _fetch_range(
+        self,
+        build_request: Callable[[], httpx.Request],
+        byte_range: Tuple[int, int],
+        follow_redirects: bool,
+    ) -> bytes:
+        response = self._send_range(build_request, byte_range, follow_redirects)
+        try:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise ValueError(
+                    f"Expected partial content for bytes {byte_range[0]}-"
+                    f"{byte_range[1]}, got status {response.status_code}"
+                )
+            data = response.read()
+        finally:
+            response.close()
+
+        expected = byte_range[1] - byte_range[0] + 1
+        if len(data) != expected:
+            raise ValueError(
+                f"Short segment for bytes {byte_range[0]}-{byte_range[1]}: "
+                f"got {len(data)} of {expected} bytes"
+            )
+        return data
+
+    def _read_from(self, response: httpx.Response, start: int) -> Iterator[bytes]:
+        chunks = response.iter_bytes(settings.stream_chunk_size)
+        if start and response.status_code != 206:
+            # Server sent the whole file; drop the bytes before ``start``
+            chunks = skip_bytes(chunks, start)
+        return chunks
@@ -1,74 +1,270 @@
+import hashlib
 import uuid
-from typing import Optional
-from supabase import create_client, Client
+import httpx
+import redis
+from functools import partial
+from typing import AsyncIterable, Callable, Iterable, Optional, Union
 from ..config import get_settings
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .resumable_upload import ResumableUpload
 
 settings = get_settings()
 
 
 class SupabaseStorageService:
-    """Service for uploading files to Supabase Storage."""
+    """Service for uploading files to Supabase Storage using REST API."""
 
-    def __init__(self):
-        self.client: Client = create_client(
-            settings.supabase_url,
-            settings.supabase_service_key,  # Use service key for uploads
-        )
+    # Uploads get a longer timeout than the provider API calls
+    UPLOAD_TIMEOUT = httpx.Timeout(60.0, connect=30.0)
+
+    def __init__(
+        self,
+        client: Optional[httpx.Client] = None,
+        redis_client: Optional[redis.Redis] = None,
+    ):
+        self.supabase_url = settings.supabase_url
+        self.service_key = settings.supabase_service_key
         self.bucket = settings.supabase_storage_bucket
+        # A shared client is owned (and closed) by whoever created it
+        self._owns_client = client is None
+        self.client = client or httpx.Client(timeout=self.UPLOAD_TIMEOUT)
+        # Holds resumable upload state; connects lazily on first use
+        self.redis = redis_client or redis.Redis.from_url(settings.redis_url)
+        self.breaker = CircuitBreaker(self.redis, "storage")
+
+    def build_storage_path(
+        self, file_name: str, folder: Optional[str] = None, key: Optional[str] = None
+    ) -> str:
+        """
+        Generate a unique object path for a file.
+
+        Args:
+            file_name: Original file name
+            folder: Optional folder path within the bucket
+            key: Stable identity of the file (its ingest_key); the same key
+                always gives the same path, so a rerun overwrites its object
+        """
+        # Generate unique filename to avoid collisions
+        if key:
+            unique_id = hashlib.sha256(key.encode()).hexdigest()[:16]
+        else:
+            unique_id = str(uuid.uuid4())[:8]
+        safe_name = file_name.replace(" ", "_")
+        return f"{folder}/{unique_id}_{safe_name}" if folder else f"{unique_id}_{safe_name}"
+
+    def get_public_url(self, storage_path: str) -> str:
+        """Construct the public URL for an object."""
+        return f"{self.supabase_url}/storage/v1/object/public/{self.bucket}/{storage_path}"
+
+    def build_upload_request(
+        self,
+        storage_path: str,
+        mime_type: str,
+        content: Union[bytes, Iterable[bytes], AsyncIterable[bytes]],
+        client: Optional[Union[httpx.Client, httpx.AsyncClient]] = None,
+    ) -> httpx.Request:
+        """
+        Build the upload request for an object.
+
+        Args:
+            storage_path: Object path within the bucket
+            mime_type: MIME type of the file
+            content: Request body; iterators are sent chunked
+            client: Client to build the request with (sync or async);
+                defaults to this service's client
+        """
+        # Supabase Storage REST API endpoint
+        upload_url = f"{self.supabase_url}/storage/v1/object/{self.bucket}/{storage_path}"
+
+        headers = {
+            "Authorization": f"Bearer {self.service_key}",
+            "Content-Type": mime_type,
+            "x-upsert": "true",  # Overwrite if exists
+        }
+
+        return (client or self.client).build_request(
+            "POST",
+            upload_url,
+            content=content,
+            headers=headers,
+            timeout=self.UPLOAD_TIMEOUT,
+        )
+
+    def build_head_request(
+        self,
+        storage_path: str,
+        client: Optional[Union[httpx.Client, httpx.AsyncClient]] = None,
+    ) -> httpx.Request:
+        """Build the request checking whether an object exists."""
+        url = f"{self.supabase_url}/storage/v1/object/{self.bucket}/{storage_path}"
+        headers = {
+            "Authorization": f"Bearer {self.service_key}",
+        }
+        return (client or self.client).build_request("HEAD", url, headers=headers)
+
+    def build_delete_request(
+        self,
+        storage_path: str,
+        client: Optional[Union[httpx.Client, httpx.AsyncClient]] = None,
+    ) -> httpx.Request:
+        """Build the request deleting an object."""
+        delete_url = f"{self.supabase_url}/storage/v1/object/{self.bucket}/{storage_path}"
+        headers = {
+            "Authorization": f"Bearer {self.service_key}",
+        }
+        return (client or self.client).build_request(
+            "DELETE", delete_url, headers=headers
+        )
+
+    def build_move_request(
+        self,
+        source_path: str,
+        destination_path: str,
+        client: Optional[Union[httpx.Client, httpx.AsyncClient]] = None,
+    ) -> httpx.Request:
+        """Build the request moving an object within the bucket."""
+        headers = {
+            "Authorization": f"Bearer {self.service_key}",
+        }
+        return (client or self.client).build_request(
+            "POST",
+            f"{self.supabase_url}/storage/v1/object/move",
+            headers=headers,
+            json={
+                "bucketId": self.bucket,
+                "sourceKey": source_path,
+                "destinationKey": destination_path,
+            },
+        )
 
     def upload_file(
         self,
-        file_content: bytes,
+        file_content: Union[bytes, Iterable[bytes]],
         file_name: str,
         mime_type: str,
         folder: Optional[str] = None,
+        storage_path: Optional[str] = None,
     ) -> dict:
         """
         Upload a file to Supabase Storage.
 
         Args:
-            file_content: The file content as bytes
+            file_content: The file content as bytes, or an iterator of byte
+                chunks which is sent as a chunked request body
             file_name: Original file name
             mime_type: MIME type of the file
             folder: Optional folder path within the bucket
+            storage_path: Explicit object path; generated from file_name
+                and folder when omitted
 
         Returns:
             Dict with storage_path and storage_url
         """
-        # Generate unique filename to avoid collisions
-        unique_id = str(uuid.uuid4())[:8]
-        safe_name = file_name.replace(" ", "_")
-        storage_path = f"{folder}/{unique_id}_{safe_name}" if folder else f"{unique_id}_{safe_name}"
+        storage_path = storage_path or self.build_storage_path(file_name, folder)
 
-        # Upload to Supabase Storage
-        response = self.client.storage.from_(self.bucket).upload(
-            path=storage_path,
-            file=file_content,
-            file_options={"content-type": mime_type},
-        )
-
-        # Get public URL
-        storage_url = self.client.storage.from_(self.bucket).get_public_url(
-            storage_path
-        )
+        request = self.build_upload_request(storage_path, mime_type, file_content)
+        response = self.breaker.call(partial(self.client.send, request))
+        response.raise_for_status()
 
         return {
             "storage_path": storage_path,
-            "storage_url": storage_url,
+            "storage_url": self.get_public_url(storage_path),
         }
 
+    def upload_stream(
+        self,
+        chunks: Union[Iterable[bytes], Callable[[int], Iterable[bytes]]],
+        file_name: str,
+        mime_type: str,
+        folder: Optional[str] = None,
+        size: int = 0,
+        resume_key: Optional[str] = None,
+        storage_path: Optional[str] = None,
+    ) -> dict:
+        """
+        Upload a file from an iterator of byte chunks.
+
+        The chunks are forwarded as they arrive, so the whole file is never
+        held in memory. Files of at least ``settings.resumable_upload_threshold``
+        bytes go through the resumable endpoint when a ``resume_key`` is given,
+        so a retry continues from the last acknowledged part.
+
+        Args:
+            chunks: File content as an iterator of byte chunks, or a callable
+                returning the chunks from a given byte offset
+            file_name: Original file name
+            mime_type: MIME type of the file
+            folder: Optional folder path within the bucket
+            size: File size in bytes, if known
+            resume_key: Stable key identifying this file across retries
+            storage_path: Explicit object path; generated from file_name,
+                folder and resume_key when omitted
+        """
+        storage_path = storage_path or self.build_storage_path(
+            file_name, folder, key=resume_key
+        )
+
+        if resume_key and size >= settings.resumable_upload_threshold > 0:
+            uploader = ResumableUpload(
+                self.client,
+                self.redis,
+                self.supabase_url,
+                self.service_key,
+                self.bucket,
+                breaker=self.breaker,
+            )
+            storage_path = uploader.upload(
+                chunks,
+                storage_path=storage_path,
+                mime_type=mime_type,
+                size=size,
+                resume_key=resume_key,
+            )
+            return {
+                "storage_path": storage_path,
+                "storage_url": self.get_public_url(storage_path),
+            }
+
+        if callable(chunks):
+            chunks = chunks(0)
+
+        return self.upload_file(
+            file_content=chunks,
+            file_name=file_name,
+            mime_type=mime_type,
+            storage_path=storage_path,
+        )
+
     def delete_file(self, storage_path: str) -> bool:
         """Delete a file from Supabase Storage."""
-        try:
-            self.client.storage.from_(self.bucket).remove([storage_path])
-            return True
-        except Exception:
-            return False
+        return self._send_ok(self.build_delete_request(storage_path))
+
+    def move_file(self, source_path: str, destination_path: str) -> bool:
+        """Move a file within the bucket."""
+        return self._send_ok(self.build_move_request(source_path, destination_path))
 
     def file_exists(self, storage_path: str) -> bool:
         """Check if a file exists in storage."""
+        return self._send_ok(self.build_head_request(storage_path))
+
+    def _send_ok(self, request: httpx.Request) -> bool:
+        """Send a request and report whether it succeeded."""
         try:
-            self.client.storage.from_(self.bucket).download(storage_path)
-            return True
+            response = self.breaker.call(partial(self.client.send, request))
+            return response.status_code == 200
+        except CircuitOpenError:
+            # Storage is down; "no" would be the wrong answer
+            raise
         except Exception:
             return False
+
+    def close(self):
+        """Close the HTTP client if this service created it."""
+        if self._owns_client:
+            self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
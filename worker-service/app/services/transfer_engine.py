@@ -0,0 +1,244 @@
+import asyncio
+import hashlib
+import httpx
+import logging
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from ..config import get_settings
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .content_store import ContentAddressedStore, ahash_chunks
+from .rate_limiter import RateLimiter, RateLimitExceeded
+from .supabase_storage import SupabaseStorageService
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Status codes worth another attempt before reporting the file as failed
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class TransferItem:
+    """A single download -> upload unit of work."""
+
+    file_info: Dict[str, Any]
+    file_name: str
+    mime_type: str
+    folder: str
+    # Builds the source download request with the engine's async client
+    build_download_request: Callable[[httpx.AsyncClient], httpx.Request]
+    follow_redirects: bool = False
+    # Stable identity of the file, so a rerun uploads to the same path
+    storage_key: Optional[str] = None
+    # Used for deduplication in content-addressed mode
+    content_hash: Optional[str] = None
+    source_checksum: Optional[str] = None
+    # Shared limit and circuit breaker of the source provider, if any
+    rate_limiter: Optional[RateLimiter] = None
+    breaker: Optional[CircuitBreaker] = None
+
+
+@dataclass
+class TransferResult:
+    """Outcome of a transfer, reported back to the job."""
+
+    file_info: Dict[str, Any]
+    storage_path: Optional[str] = None
+    storage_url: Optional[str] = None
+    content_hash: Optional[str] = None
+    deduplicated: bool = False
+    error: Optional[str] = None
+    # Set when an upstream's breaker was open; the file should be deferred
+    retry_after: Optional[float] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class AsyncTransferEngine:
+    """
+    Runs many download -> upload transfers concurrently on one event loop.
+
+    Transfers are network-bound, so a single process can keep far more of
+    them in flight than there are prefork worker slots.
+    """
+
+    def __init__(
+        self,
+        storage_service: SupabaseStorageService,
+        concurrency: Optional[int] = None,
+        content_store: Optional[ContentAddressedStore] = None,
+    ):
+        self.storage_service = storage_service
+        self.concurrency = concurrency or settings.async_transfer_concurrency
+        self.content_store = content_store
+
+    def run(self, items: List[TransferItem]) -> List[TransferResult]:
+        """
+        Transfer a batch of files and wait for all of them.
+
+        Returns:
+            One TransferResult per item, in the same order
+        """
+        return asyncio.run(self._run(items))
+
+    async def _run(self, items: List[TransferItem]) -> List[TransferResult]:
+        limits = httpx.Limits(
+            max_connections=self.concurrency * 2,  # download + upload
+            max_keepalive_connections=self.concurrency,
+        )
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async with httpx.AsyncClient(timeout=30.0, limits=limits) as client:
+            return await asyncio.gather(
+                *(self._transfer(client, semaphore, item) for item in items)
+            )
+
+    async def _transfer(
+        self,
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        item: TransferItem,
+    ) -> TransferResult:
+        async with semaphore:
+            attempt = 0
+            while True:
+                attempt += 1
+                try:
+                    return await self._transfer_once(client, item)
+                except CircuitOpenError as e:
+                    return TransferResult(
+                        file_info=item.file_info,
+                        error=str(e),
+                        retry_after=e.retry_after,
+                    )
+                except Exception as e:
+                    if attempt > settings.max_retries or not _is_retryable(e):
+                        logger.error(
+                            f"Error transferring file {item.file_name}: {str(e)}"
+                        )
+                        return TransferResult(file_info=item.file_info, error=str(e))
+
+                    logger.warning(
+                        f"Retrying {item.file_name} after {e}, "
+                        f"attempt {attempt}/{settings.max_retries}"
+                    )
+                    await asyncio.sleep(settings.retry_delay * 2 ** (attempt - 1))
+
+    async def _transfer_once(
+        self, client: httpx.AsyncClient, item: TransferItem
+    ) -> TransferResult:
+        if self.content_store:
+            return await self._transfer_content_addressed(client, item)
+
+        storage_path = self.storage_service.build_storage_path(
+            item.file_name, item.folder, key=item.storage_key
+        )
+        await self._stream(client, item, storage_path)
+
+        return TransferResult(
+            file_info=item.file_info,
+            storage_path=storage_path,
+            storage_url=self.storage_service.get_public_url(storage_path),
+        )
+
+    async def _transfer_content_addressed(
+        self, client: httpx.AsyncClient, item: TransferItem
+    ) -> TransferResult:
+        store = self.content_store
+        known_hash = await asyncio.to_thread(
+            store.lookup, item.content_hash, item.source_checksum
+        )
+        if known_hash and await store.aexists(client, store.blob_path(known_hash)):
+            return self._blob_result(item, known_hash, deduplicated=True)
+
+        if item.content_hash:
+            # A provider SHA-256 lets us upload straight to the blob path
+            await self._stream(client, item, store.blob_path(item.content_hash))
+            return self._blob_result(item, item.content_hash, deduplicated=False)
+
+        hasher = hashlib.sha256()
+        staging_path = store.staging_path()
+        await self._stream(client, item, staging_path, hasher)
+        digest = hasher.hexdigest()
+
+        deduplicated = await store.apromote(client, staging_path, digest)
+        await asyncio.to_thread(store.remember, item.source_checksum, digest)
+        return self._blob_result(item, digest, deduplicated)
+
+    def _blob_result(
+        self, item: TransferItem, content_hash: str, deduplicated: bool
+    ) -> TransferResult:
+        result = self.content_store.result(content_hash, deduplicated)
+        return TransferResult(
+            file_info=item.file_info,
+            storage_path=result["storage_path"],
+            storage_url=result["storage_url"],
+            content_hash=content_hash,
+            deduplicated=deduplicated,
+        )
+
+    async def _stream(
+        self,
+        client: httpx.AsyncClient,
+        item: TransferItem,
+        storage_path: str,
+        hasher=None,
+    ) -> None:
+        """Pipe the source download into an upload at ``storage_path``."""
+        request = item.build_download_request(client)
+        download = await self._guard(
+            item.breaker, partial(self._download, client, item, request), stream=True
+        )
+        try:
+            download.raise_for_status()
+
+            chunks = download.aiter_bytes(settings.stream_chunk_size)
+            if item.breaker:
+                # Read errors surface inside the upload; charge them to the source
+                chunks = item.breaker.aread(chunks)
+            if hasher is not None:
+                chunks = ahash_chunks(chunks, hasher)
+
+            upload_request = self.storage_service.build_upload_request(
+                storage_path, item.mime_type, chunks, client=client
+            )
+            upload = await self._guard(
+                self.storage_service.breaker, partial(client.send, upload_request)
+            )
+            upload.raise_for_status()
+        finally:
+            await download.aclose()
+
+    async def _download(
+        self, client: httpx.AsyncClient, item: TransferItem, request: httpx.Request
+    ) -> httpx.Response:
+        """Open the source download within the provider's rate limit."""
+        if item.rate_limiter:
+            await item.rate_limiter.aacquire()
+        download = await client.send(
+            request, stream=True, follow_redirects=item.follow_redirects
+        )
+        if item.rate_limiter:
+            await item.rate_limiter.aobserve(download)
+        return download
+
+    async def _guard(
+        self,
+        breaker: Optional[CircuitBreaker],
+        send: Callable[[], Awaitable[httpx.Response]],
+        stream: bool = False,
+    ) -> httpx.Response:
+        """Send through a circuit breaker, if there is one."""
+        if breaker:
+            return await breaker.acall(send, stream=stream)
+        return await send()
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Whether a transfer error is transient."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (httpx.TransportError, RateLimitExceeded))
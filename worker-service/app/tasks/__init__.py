@@ -1,4 +1,13 @@
 from .google_drive import import_folder as import_google_drive_folder
+from .google_drive import sync_folder as sync_google_drive_folder
 from .dropbox import import_folder as import_dropbox_folder
+from .dropbox import sync_folder as sync_dropbox_folder
+from .sync import resync_watched_folders
 
-__all__ = ["import_google_drive_folder", "import_dropbox_folder"]
+__all__ = [
+    "import_google_drive_folder",
+    "sync_google_drive_folder",
+    "import_dropbox_folder",
+    "sync_dropbox_folder",
+    "resync_watched_folders",
+]
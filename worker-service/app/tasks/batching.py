@@ -0,0 +1,44 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from ..config import get_settings
+
+settings = get_settings()
+
+
+def get_listed_size(file_info: Dict[str, Any]) -> int:
+    """Size of a file from its listing, or a nominal size if not listed."""
+    return int(file_info.get("size") or settings.batch_default_file_size)
+
+
+def split_by_bytes(
+    files: Iterable[Dict[str, Any]],
+    max_bytes: Optional[int] = None,
+    max_files: Optional[int] = None,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Group files into batches of roughly equal total size.
+
+    A batch is closed once adding the next file would take it past
+    ``max_bytes`` or it holds ``max_files`` files, so many small files share
+    one task while big ones end up in batches of their own.
+
+    Args:
+        files: File metadata from a listing, with a 'size' field
+        max_bytes: Target total size of a batch
+        max_files: Max number of files in a batch
+    """
+    max_bytes = max_bytes or settings.batch_max_bytes
+    max_files = max_files or settings.chunk_size
+
+    batch = []
+    batch_bytes = 0
+    for file_info in files:
+        size = get_listed_size(file_info)
+        if batch and (batch_bytes + size > max_bytes or len(batch) >= max_files):
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append(file_info)
+        batch_bytes += size
+
+    if batch:
+        yield batch
@@ -1,31 +1,32 @@
 from celery import shared_task, group
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from datetime import datetime
-from typing import Dict, Any
+from sqlalchemy import text
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import Dict, Any, List, Optional
 import logging
 
 from ..config import get_settings
-from ..services.dropbox_service import DropboxService
-from ..services.supabase_storage import SupabaseStorageService
+from ..db import get_db
+from ..services.clients import get_dropbox_service, get_storage_service
+from ..services.circuit_breaker import CircuitOpenError
+from ..services.content_store import ContentAddressedStore
+from ..services.transfer_engine import AsyncTransferEngine, TransferItem
+from .batching import split_by_bytes
+from .jobs import (
+    add_progress,
+    finish_listing,
+    is_large_file,
+    publish_job_event,
+    record_batch,
+    record_results,
+    start_listing,
+    touch_images,
+)
+from .sync import get_imported_ids, get_last_synced_at, save_sync_state
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
-# Database setup
-engine = create_engine(settings.database_url)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-
-def get_db():
-    """Get database session."""
-    db = SessionLocal()
-    try:
-        return db
-    except Exception:
-        db.close()
-        raise
-
 
 @shared_task(
     bind=True,
@@ -39,73 +40,149 @@ def import_folder(self, job_id: str, shared_link: str):
     Import all images from a Dropbox shared folder.
 
     This task:
-    1. Lists all images in the folder
-    2. Updates job with total count
-    3. Spawns individual tasks for each image
+    1. Lists the images in the folder page by page
+    2. Adds each page to the job's total count
+    3. Spawns tasks for each page's images before fetching the next page
     """
     logger.info(f"Starting Dropbox import for job {job_id}")
 
     db = get_db()
+    listed = 0
 
     try:
         # Get Dropbox service
-        dropbox_service = DropboxService()
+        dropbox_service = get_dropbox_service()
+
+        # Queue each page of files as soon as it is listed
+        start_listing(db, job_id)
+        for files in dropbox_service.iter_shared_folder_files(shared_link):
+            enqueue_files(job_id, shared_link, files)
+            listed += len(files)
 
-        # List all files in folder
-        files = dropbox_service.list_shared_folder_files(shared_link)
-        total_files = len(files)
+        logger.info(f"Found {listed} images in folder")
 
-        logger.info(f"Found {total_files} images in folder")
+        return finish_listing(db, job_id, listed)
 
-        # Update job with total count
+    except Exception as e:
+        logger.error(f"Error in import_folder: {str(e)}")
         db.execute(
-            """
-            UPDATE import_jobs
-            SET total_files = :total, status = 'processing'
-            WHERE id = :job_id
-            """,
-            {"total": total_files, "job_id": job_id},
+            text(
+                """
+                UPDATE import_jobs
+                SET status = 'failed', error_message = :error, updated_at = now()
+                WHERE id = :job_id
+                """
+            ),
+            {"job_id": job_id, "error": str(e)},
         )
         db.commit()
+        publish_job_event(job_id, status="failed", error_message=str(e))
+        if listed:
+            # Queued files keep importing; listing again would queue them twice
+            return {"status": "failed", "total": listed}
+        raise
+    finally:
+        db.close()
 
-        if total_files == 0:
-            # No files to import
-            db.execute(
+
+@shared_task(
+    bind=True,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_kwargs={"max_retries": 3},
+    name="worker.tasks.dropbox.sync_folder",
+)
+def sync_folder(self, job_id: str, shared_link: str, watch: bool = False):
+    """
+    Sync a Dropbox shared folder against what was imported before.
+
+    Shared links cannot be listed recursively, so every sync walks the
+    folder tree like an import does. This task:
+    1. Lists the folder page by page, spawning tasks for files that were
+       never imported (including ones moved in with an old modification
+       time) or were modified since the last sync
+    2. Marks images of files no longer in the folder as deleted
+    3. Saves the sync point once every page has been dispatched, so a
+       retry lists the same changes again
+    """
+    logger.info(f"Starting Dropbox sync for job {job_id}")
+
+    db = get_db()
+    listed = 0
+
+    try:
+        dropbox_service = get_dropbox_service()
+
+        since = get_last_synced_at(db, "dropbox", shared_link, job_id)
+        # Leave a margin for clock skew between us and Dropbox
+        synced_at = datetime.now(timezone.utc) - timedelta(
+            seconds=settings.sync_clock_skew
+        )
+        imported_ids = get_imported_ids(db, "dropbox", shared_link)
+        current_ids = set()
+
+        start_listing(db, job_id)
+        for files in dropbox_service.iter_shared_folder_files(shared_link):
+            current_ids.update(f["id"] for f in files if f.get("id"))
+            changed = [
+                f
+                for f in files
+                if f.get("id") not in imported_ids
+                or since is None
+                or get_server_modified(f) > since
+            ]
+            if changed:
+                enqueue_files(job_id, shared_link, changed)
+                listed += len(changed)
+
+        # Anything imported from this folder that is gone now was deleted
+        result = db.execute(
+            text(
                 """
-                UPDATE import_jobs
-                SET status = 'completed', completed_at = :now
-                WHERE id = :job_id
-                """,
-                {"job_id": job_id, "now": datetime.utcnow()},
-            )
-            db.commit()
-            return {"status": "completed", "total": 0}
-
-        # Process files in chunks
-        chunk_size = settings.chunk_size
-        for i in range(0, total_files, chunk_size):
-            chunk = files[i : i + chunk_size]
-
-            # Create group of tasks for this chunk
-            tasks = group(
-                process_single_file.s(job_id, shared_link, file_info)
-                for file_info in chunk
-            )
-            tasks.apply_async()
+                UPDATE images
+                SET status = 'deleted'
+                WHERE source = 'dropbox' AND status = 'completed'
+                  AND dropbox_id <> ''
+                  AND NOT (dropbox_id = ANY(:current_ids))
+                  AND import_job_id IN (
+                      SELECT id FROM import_jobs
+                      WHERE source = 'dropbox' AND source_key = :shared_link
+                  )
+                """
+            ),
+            {"current_ids": list(current_ids), "shared_link": shared_link},
+        )
+        db.commit()
+        if result.rowcount:
+            touch_images("dropbox")
 
-        return {"status": "processing", "total": total_files}
+        logger.info(
+            f"Found {listed} changed images in folder, "
+            f"marked {result.rowcount} as deleted"
+        )
+
+        save_sync_state(db, job_id, "dropbox", shared_link, None, synced_at, watch)
+        db.commit()
+
+        return finish_listing(db, job_id, listed)
 
     except Exception as e:
-        logger.error(f"Error in import_folder: {str(e)}")
+        logger.error(f"Error in sync_folder: {str(e)}")
         db.execute(
-            """
-            UPDATE import_jobs
-            SET status = 'failed', error_message = :error
-            WHERE id = :job_id
-            """,
+            text(
+                """
+                UPDATE import_jobs
+                SET status = 'failed', error_message = :error, updated_at = now()
+                WHERE id = :job_id
+                """
+            ),
             {"job_id": job_id, "error": str(e)},
         )
         db.commit()
+        publish_job_event(job_id, status="failed", error_message=str(e))
+        if listed:
+            # Queued files keep importing; listing again would queue them twice
+            return {"status": "failed", "total": listed}
         raise
     finally:
         db.close()
@@ -118,131 +195,253 @@ def import_folder(self, job_id: str, shared_link: str):
     retry_kwargs={"max_retries": 3},
     name="worker.tasks.dropbox.process_single_file",
 )
-def process_single_file(self, job_id: str, shared_link: str, file_info: Dict[str, Any]):
+def process_single_file(
+    self,
+    job_id: str,
+    shared_link: str,
+    file_info: Dict[str, Any],
+    deferrals: int = 0,
+):
     """
     Process a single file: download from Dropbox and upload to Supabase.
     """
-    file_id = file_info.get("id", "")
     file_name = file_info["name"]
-    file_path = file_info.get("path_display", file_info.get("path_lower", ""))
+    file_path = get_file_path(file_info)
+    mime_type = get_mime_type(file_name)
     file_size = int(file_info.get("size", 0))
 
-    # Determine MIME type from extension
-    ext = file_name.lower().split(".")[-1] if "." in file_name else ""
-    mime_types = {
-        "jpg": "image/jpeg",
-        "jpeg": "image/jpeg",
-        "png": "image/png",
-        "gif": "image/gif",
-        "webp": "image/webp",
-        "bmp": "image/bmp",
-        "tiff": "image/tiff",
-    }
-    mime_type = mime_types.get(ext, "image/jpeg")
-
     logger.info(f"Processing file: {file_name} ({file_path})")
 
-    db = get_db()
-
     try:
-        # Download file from Dropbox
-        dropbox_service = DropboxService()
-        file_content = dropbox_service.download_shared_file(shared_link, file_path)
-
-        # Upload to Supabase Storage
-        storage_service = SupabaseStorageService()
-        upload_result = storage_service.upload_file(
-            file_content=file_content,
-            file_name=file_name,
-            mime_type=mime_type,
-            folder="dropbox",
+        # Open a streaming download from Dropbox; resumed uploads
+        # ask for the stream from their last acknowledged offset
+        dropbox_service = get_dropbox_service()
+        chunks = partial(
+            dropbox_service.stream_shared_file, shared_link, file_path, file_size
         )
 
-        # Insert image record
-        db.execute(
-            """
-            INSERT INTO images (
-                name, dropbox_id, source, size, mime_type,
-                storage_path, storage_url, import_job_id, status
-            ) VALUES (
-                :name, :dropbox_id, 'dropbox', :size, :mime_type,
-                :storage_path, :storage_url, :job_id, 'completed'
+        # Stream chunks straight into Supabase Storage
+        storage_service = get_storage_service()
+        resume_key = ingest_key(job_id, file_info)
+        if settings.content_addressed_storage:
+            content_store = ContentAddressedStore(storage_service)
+            upload_result = content_store.put(
+                chunks,
+                mime_type=mime_type,
+                size=file_size,
+                resume_key=resume_key,
+                content_hash=None,
+                source_checksum=get_source_checksum(file_info),
+            )
+        else:
+            upload_result = storage_service.upload_stream(
+                chunks=chunks,
+                file_name=file_name,
+                mime_type=mime_type,
+                folder="dropbox",
+                size=file_size,
+                resume_key=resume_key,
             )
-            """,
-            {
-                "name": file_name,
-                "dropbox_id": file_id,
-                "size": file_size,
-                "mime_type": mime_type,
-                "storage_path": upload_result["storage_path"],
-                "storage_url": upload_result["storage_url"],
-                "job_id": job_id,
-            },
-        )
-
-        # Update job progress
-        db.execute(
-            """
-            UPDATE import_jobs
-            SET processed_files = processed_files + 1
-            WHERE id = :job_id
-            """,
-            {"job_id": job_id},
-        )
-        db.commit()
 
-        # Check if job is complete
-        check_job_completion(job_id)
+        # Record the image and the job's progress
+        record_results(job_id, [image_row(job_id, file_info, upload_result)])
 
         logger.info(f"Successfully processed file: {file_name}")
         return {"status": "success", "file_name": file_name}
 
     except Exception as e:
-        logger.error(f"Error processing file {file_name}: {str(e)}")
+        if isinstance(e, CircuitOpenError) and deferrals < settings.circuit_max_deferrals:
+            # An upstream is down: come back once its breaker may have
+            # closed, without counting the file as failed. Deferrals are
+            # counted apart from retries, which are kept for real errors
+            logger.warning(f"Deferring file {file_name}: {str(e)}")
+            process_single_file.apply_async(
+                (job_id, shared_link, file_info, deferrals + 1),
+                countdown=e.countdown(),
+                retries=self.request.retries,
+            )
+            return {"status": "deferred", "file_name": file_name}
 
-        # Update failed count
-        db.execute(
-            """
-            UPDATE import_jobs
-            SET failed_files = failed_files + 1
-            WHERE id = :job_id
-            """,
-            {"job_id": job_id},
-        )
-        db.commit()
+        logger.error(f"Error processing file {file_name}: {str(e)}")
 
-        # Check if job is complete (even with failures)
-        check_job_completion(job_id)
+        # Count the file as failed once it will not be retried again, and
+        # check if the job is complete (even with failures)
+        if self.request.retries >= self.max_retries:
+            record_results(job_id, [], failed=1)
 
         raise
-    finally:
-        db.close()
 
 
-def check_job_completion(job_id: str):
-    """Check if job is complete and update status."""
-    db = get_db()
+@shared_task(
+    bind=True,
+    name="worker.tasks.dropbox.process_batch",
+)
+def process_batch(
+    self,
+    job_id: str,
+    shared_link: str,
+    files: List[Dict[str, Any]],
+    deferrals: int = 0,
+):
+    """
+    Process a batch of files in one task with the async transfer engine.
+
+    Each file is retried inside the engine, so the task itself is not
+    retried; per-file failures are recorded against the job instead. If
+    recording fails, only the recording is retried, by ``record_batch``.
+    Files stopped by an open circuit breaker are sent back as a deferred batch.
+    """
+    logger.info(f"Processing batch of {len(files)} files for job {job_id}")
+
+    dropbox_service = get_dropbox_service()
+    storage_service = get_storage_service()
+    content_store = None
+    if settings.content_addressed_storage:
+        content_store = ContentAddressedStore(storage_service)
+    concurrency = None
+    if not settings.async_transfer_enabled:
+        concurrency = settings.batch_transfer_concurrency
+    engine = AsyncTransferEngine(
+        storage_service, concurrency=concurrency, content_store=content_store
+    )
+
+    items = [
+        TransferItem(
+            file_info=file_info,
+            file_name=file_info["name"],
+            mime_type=get_mime_type(file_info["name"]),
+            folder="dropbox",
+            build_download_request=partial(
+                dropbox_service.build_download_request,
+                shared_link,
+                get_file_path(file_info),
+            ),
+            storage_key=ingest_key(job_id, file_info),
+            source_checksum=get_source_checksum(file_info),
+            rate_limiter=dropbox_service.rate_limiter,
+            breaker=dropbox_service.content_breaker,
+        )
+        for file_info in files
+    ]
+    results = engine.run(items)
+
+    processed = [r for r in results if r.ok]
+    deferred = [r for r in results if r.retry_after is not None]
+    failed = len(results) - len(processed) - len(deferred)
+    if deferrals >= settings.circuit_max_deferrals:
+        failed += len(deferred)
+        deferred = []
+
+    rows = [
+        image_row(
+            job_id,
+            result.file_info,
+            {
+                "storage_path": result.storage_path,
+                "storage_url": result.storage_url,
+                "content_hash": result.content_hash,
+            },
+        )
+        for result in processed
+    ]
+    # Record the whole batch's images and progress at once
     try:
-        result = db.execute(
-            """
-            SELECT total_files, processed_files, failed_files
-            FROM import_jobs WHERE id = :job_id
-            """,
-            {"job_id": job_id},
-        ).fetchone()
-
-        if result:
-            total, processed, failed = result
-            if processed + failed >= total:
-                status = "completed" if failed == 0 else "completed_with_errors"
-                db.execute(
-                    """
-                    UPDATE import_jobs
-                    SET status = :status, completed_at = :now
-                    WHERE id = :job_id
-                    """,
-                    {"job_id": job_id, "status": status, "now": datetime.utcnow()},
-                )
-                db.commit()
-    finally:
-        db.close()
+        record_results(job_id, rows, failed)
+    except Exception as e:
+        logger.warning(f"Recording batch for job {job_id} failed, retrying: {str(e)}")
+        record_batch.apply_async((job_id, rows, failed), countdown=settings.retry_delay)
+
+    if deferred:
+        # An upstream is down: retry these files once its breaker may
+        # have closed, without counting them as failed
+        countdown = max(r.retry_after for r in deferred)
+        logger.warning(f"Deferring {len(deferred)} files for {countdown:.1f}s")
+        process_batch.apply_async(
+            (job_id, shared_link, [r.file_info for r in deferred], deferrals + 1),
+            countdown=countdown,
+        )
+
+    logger.info(
+        f"Batch finished for job {job_id}: {len(processed)} processed, {failed} failed"
+    )
+    return {"status": "success", "processed": len(processed), "failed": failed}
+
+
+def get_file_path(file_info: Dict[str, Any]) -> str:
+    """Get the path of a file within the shared folder."""
+    return file_info.get("path_display", file_info.get("path_lower", ""))
+
+
+def get_server_modified(file_info: Dict[str, Any]) -> datetime:
+    """Parse a listing entry's server_modified time."""
+    return datetime.strptime(
+        file_info["server_modified"], "%Y-%m-%dT%H:%M:%SZ"
+    ).replace(tzinfo=timezone.utc)
+
+
+def get_mime_type(file_name: str) -> str:
+    """Determine MIME type from extension."""
+    ext = file_name.lower().split(".")[-1] if "." in file_name else ""
+    mime_types = {
+        "jpg": "image/jpeg",
+        "jpeg": "image/jpeg",
+        "png": "image/png",
+        "gif": "image/gif",
+        "webp": "image/webp",
+        "bmp": "image/bmp",
+        "tiff": "image/tiff",
+    }
+    return mime_types.get(ext, "image/jpeg")
+
+
+def enqueue_files(job_id: str, shared_link: str, files: List[Dict[str, Any]]):
+    """Add a page of files to the job's total and dispatch their transfers."""
+    add_progress(job_id, total=len(files))
+
+    # Large files keep the resumable upload path in their own task; the
+    # rest share tasks in batches of similar total size
+    single_files = [f for f in files if is_large_file(f)]
+    batch_files = [f for f in files if not is_large_file(f)]
+
+    for batch in split_by_bytes(batch_files):
+        process_batch.delay(job_id, shared_link, batch)
+
+    if single_files:
+        tasks = group(
+            process_single_file.s(job_id, shared_link, file_info)
+            for file_info in single_files
+        )
+        tasks.apply_async()
+
+
+def get_source_checksum(file_info: Dict[str, Any]) -> Optional[str]:
+    """Provider checksum used to find previously stored content."""
+    content_hash = file_info.get("content_hash")
+    return f"dropbox:{content_hash}" if content_hash else None
+
+
+def ingest_key(job_id: str, file_info: Dict[str, Any]) -> str:
+    """Identity of a file within a job, shared by its upload and image row."""
+    return f"{job_id}:{file_info.get('id') or get_file_path(file_info)}"
+
+
+def image_row(
+    job_id: str, file_info: Dict[str, Any], upload_result: Dict[str, str]
+) -> Dict[str, Any]:
+    """Build the image record for a transferred file."""
+    return {
+        "name": file_info["name"],
+        "google_drive_id": None,
+        "dropbox_id": file_info.get("id"),
+        "source": "dropbox",
+        "size": int(file_info.get("size", 0)),
+        "mime_type": get_mime_type(file_info["name"]),
+        "source_path": get_file_path(file_info),
+        "storage_path": upload_result["storage_path"],
+        "storage_url": upload_result["storage_url"],
+        "content_hash": upload_result.get("content_hash"),
+        "import_job_id": job_id,
+        # Identifies the row so a replayed write never duplicates it
+        "ingest_key": ingest_key(job_id, file_info),
+        "status": "completed",
+    }
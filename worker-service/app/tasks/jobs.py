@@ -0,0 +1,355 @@
+from celery import shared_task
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql import column, table
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List
+import json
+import logging
+import time
+
+from ..config import get_settings
+from ..db import get_db
+from ..services.clients import get_redis
+from .sync import supersede_replaced_images
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Columns of an image row written by the workers
+images = table(
+    "images",
+    column("name"),
+    column("google_drive_id"),
+    column("dropbox_id"),
+    column("source"),
+    column("size"),
+    column("mime_type"),
+    column("source_path"),
+    column("storage_path"),
+    column("storage_url"),
+    column("content_hash"),
+    column("import_job_id"),
+    column("ingest_key"),
+    column("status"),
+)
+
+
+# Add to a job's counters and report, from the same atomic step, whether
+# this call completed the job and whether the counters are due for a flush
+# to import_jobs. Only one caller ever sees completed = 1. Stored files are
+# passed by ingest_key (ARGV[8] onwards) and counted once each, however often
+# their results are replayed.
+PROGRESS_SCRIPT = """
+if ARGV[4] == '1' then
+    redis.call('HSET', KEYS[1], 'listed', 1)
+end
+local stored = 0
+for i = 8, #ARGV do
+    stored = stored + redis.call('SADD', KEYS[2], ARGV[i])
+end
+if #ARGV >= 8 then
+    redis.call('EXPIRE', KEYS[2], ARGV[7])
+end
+local total = redis.call('HINCRBY', KEYS[1], 'total', ARGV[3])
+local processed = redis.call('HINCRBY', KEYS[1], 'processed', ARGV[1] + stored)
+local failed = redis.call('HINCRBY', KEYS[1], 'failed', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[7])
+
+local completed = 0
+if redis.call('HGET', KEYS[1], 'listed') == '1' and processed + failed >= total then
+    completed = redis.call('HSETNX', KEYS[1], 'completed', 1)
+end
+
+local flush = 0
+local flushed_at = tonumber(redis.call('HGET', KEYS[1], 'flushed_at')) or 0
+if completed == 0 and tonumber(ARGV[5]) - flushed_at >= tonumber(ARGV[6]) then
+    redis.call('HSET', KEYS[1], 'flushed_at', ARGV[5])
+    flush = 1
+end
+
+return {completed, flush, total, processed, failed}
+"""
+
+
+def progress_key(job_id: str) -> str:
+    """Redis hash holding a job's live counters."""
+    return f"job:{job_id}:progress"
+
+
+def stored_key(job_id: str) -> str:
+    """Redis set of the ingest_keys a job has counted as processed."""
+    return f"job:{job_id}:stored"
+
+
+def publish_job_event(job_id: str, **fields: Any):
+    """Push a change of a job's state to the gateway's event streams."""
+    get_redis().publish(f"job:{job_id}:events", json.dumps(fields, default=str))
+
+
+def start_progress(job_id: str):
+    """Reset a job's counters before its folder is listed."""
+    pipe = get_redis().pipeline()
+    pipe.delete(progress_key(job_id), stored_key(job_id))
+    pipe.hset(
+        progress_key(job_id),
+        mapping={"total": 0, "processed": 0, "failed": 0, "listed": 0},
+    )
+    pipe.expire(progress_key(job_id), settings.progress_ttl)
+    pipe.execute()
+
+    publish_job_event(
+        job_id, status="listing", total_files=0, processed_files=0, failed_files=0
+    )
+
+
+def add_progress(
+    job_id: str,
+    processed: int = 0,
+    failed: int = 0,
+    total: int = 0,
+    listed: bool = False,
+    stored: Iterable[str] = (),
+):
+    """
+    Update a job's live counters.
+
+    The caller whose update completes the job finalizes it in the database;
+    otherwise counters are written to import_jobs at most once per
+    ``progress_flush_interval``.
+
+    Args:
+        job_id: Import job to update
+        processed: Files stored since the last update
+        failed: Files that failed for good since the last update
+        total: Files added to the job by listing
+        listed: Listing has finished, so the total is final
+        stored: Ingest keys of stored files; each is counted as processed
+            only the first time it is reported
+    """
+    script = get_redis().register_script(PROGRESS_SCRIPT)
+    completed, flush, *counts = script(
+        keys=[progress_key(job_id), stored_key(job_id)],
+        args=[
+            processed,
+            failed,
+            total,
+            1 if listed else 0,
+            time.time(),
+            settings.progress_flush_interval,
+            settings.progress_ttl,
+            *stored,
+        ],
+    )
+
+    total, processed, failed = counts
+    event = {"total_files": total, "processed_files": processed, "failed_files": failed}
+
+    if completed:
+        event.update(complete_job(job_id, *counts))
+    elif flush:
+        db = get_db()
+        try:
+            flush_progress(db, job_id, *counts)
+            db.commit()
+        finally:
+            db.close()
+
+    if listed and not completed:
+        event["status"] = "processing"
+    publish_job_event(job_id, **event)
+
+
+def touch_images(*sources: str):
+    """
+    Invalidate the gateway's cached image reads for sources whose rows changed.
+
+    The gateway keys its response cache on these per-source generations.
+    """
+    pipe = get_redis().pipeline(transaction=False)
+    for source in set(sources):
+        pipe.incr(f"images:generation:{source}")
+    pipe.execute()
+
+
+def start_listing(db, job_id: str):
+    """Mark the job as listing; it cannot complete until listing finishes."""
+    db.execute(
+        text(
+            """
+            UPDATE import_jobs
+            SET status = 'listing', total_files = 0, updated_at = now()
+            WHERE id = :job_id
+            """
+        ),
+        {"job_id": job_id},
+    )
+    db.commit()
+    start_progress(job_id)
+
+
+def finish_listing(db, job_id: str, total_files: int) -> dict:
+    """
+    Move a fully listed job to processing.
+
+    Transfers may have finished while pages were still being listed, so
+    this update can be the one that completes the job.
+
+    Returns:
+        Task result describing the job state
+    """
+    db.execute(
+        text(
+            """
+            UPDATE import_jobs
+            SET status = 'processing', updated_at = now()
+            WHERE id = :job_id AND status = 'listing'
+            """
+        ),
+        {"job_id": job_id},
+    )
+    db.commit()
+
+    add_progress(job_id, listed=True)
+    return {"status": "processing", "total": total_files}
+
+
+def is_large_file(file_info: Dict[str, Any]) -> bool:
+    """Whether a file should use the resumable upload path."""
+    threshold = settings.resumable_upload_threshold
+    return threshold > 0 and int(file_info.get("size", 0)) >= threshold
+
+
+def record_results(job_id: str, rows: List[Dict[str, Any]], failed: int = 0):
+    """
+    Record a job's transferred files and failures.
+
+    With write-behind enabled the image rows are handed to the image writer
+    through a Redis stream, and it counts them as processed once they are
+    stored; otherwise they are inserted here. Rows are counted by ingest_key,
+    so recording the same results again is harmless.
+
+    Args:
+        job_id: Import job the files belong to
+        rows: Image rows for successfully transferred files
+        failed: Number of files that failed for good
+    """
+    if settings.write_behind_enabled and rows:
+        pipe = get_redis().pipeline(transaction=False)
+        for row in rows:
+            pipe.xadd(settings.image_stream, {"row": json.dumps(row)})
+        pipe.execute()
+        rows = []
+
+    inserted = Counter()
+    if rows:
+        db = get_db()
+        try:
+            inserted = insert_images(db, rows)
+            db.commit()
+        finally:
+            db.close()
+
+    if inserted:
+        touch_images(*(row["source"] for row in rows))
+
+    if rows or failed:
+        # Rows stored by an earlier attempt count too; the ingest_key makes
+        # sure no file is counted twice
+        add_progress(
+            job_id, failed=failed, stored=[row["ingest_key"] for row in rows]
+        )
+
+
+@shared_task(
+    bind=True,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_kwargs={"max_retries": 5},
+    name="worker.tasks.jobs.record_batch",
+)
+def record_batch(self, job_id: str, rows: List[Dict[str, Any]], failed: int = 0):
+    """
+    Record a batch's results once recording them in the batch task failed.
+
+    The files are already in storage, so only this step is retried; rows
+    and progress are keyed by ingest_key, which makes a rerun safe.
+    """
+    record_results(job_id, rows, failed)
+    return {"status": "success", "processed": len(rows), "failed": failed}
+
+
+def insert_images(db, rows: List[Dict[str, Any]]) -> Counter:
+    """
+    Insert image rows in one statement, skipping rows already stored.
+
+    Returns:
+        Number of new rows per import job
+    """
+    if not rows:
+        return Counter()
+
+    statement = (
+        insert(images)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["ingest_key"])
+        .returning(images.c.import_job_id)
+    )
+    result = db.execute(statement)
+    return Counter(str(job_id) for (job_id,) in result)
+
+
+def flush_progress(db, job_id: str, total: int, processed: int, failed: int):
+    """Write a job's live counters to import_jobs."""
+    db.execute(
+        text(
+            """
+            UPDATE import_jobs
+            SET total_files = :total,
+                processed_files = :processed,
+                failed_files = :failed,
+                updated_at = now()
+            WHERE id = :job_id
+            """
+        ),
+        {"job_id": job_id, "total": total, "processed": processed, "failed": failed},
+    )
+
+
+def complete_job(job_id: str, total: int, processed: int, failed: int) -> dict:
+    """
+    Write a finished job's final counters and status.
+
+    Returns:
+        The job's new status fields
+    """
+    completed_at = datetime.utcnow()
+    db = get_db()
+    try:
+        flush_progress(db, job_id, total, processed, failed)
+
+        status = "completed" if failed == 0 else "completed_with_errors"
+        result = db.execute(
+            text(
+                """
+                UPDATE import_jobs
+                SET status = :status, completed_at = :now, updated_at = now()
+                WHERE id = :job_id AND status = 'processing'
+                RETURNING job_type, source
+                """
+            ),
+            {"job_id": job_id, "status": status, "now": completed_at},
+        ).fetchone()
+
+        if result and result[0] == "sync":
+            supersede_replaced_images(db, job_id)
+        db.commit()
+    finally:
+        db.close()
+
+    if result and result[0] == "sync":
+        touch_images(result[1])
+
+    logger.info(f"Job {job_id} {status}: {processed} of {total} files processed")
+    return {"status": status, "completed_at": completed_at.isoformat()}
@@ -0,0 +1,192 @@
+from celery import shared_task, current_app
+from sqlalchemy import text
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Set
+import logging
+import uuid
+
+from ..config import get_settings
+from ..db import get_db
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Sync task and queue for each source
+SYNC_TASKS = {
+    "google_drive": ("worker.tasks.google_drive.sync_folder", "google_drive"),
+    "dropbox": ("worker.tasks.dropbox.sync_folder", "dropbox"),
+}
+
+
+@shared_task(name="worker.tasks.sync.resync_watched_folders")
+def resync_watched_folders():
+    """
+    Start a sync job for every watched folder that is due.
+
+    Runs periodically from Celery beat. Folders that already have a sync job
+    in flight are skipped.
+    """
+    db = get_db()
+
+    try:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.sync_interval)
+        due = db.execute(
+            text(
+                """
+                SELECT s.source, s.source_key, s.source_url
+                FROM sync_states s
+                WHERE s.watched
+                  AND (s.last_synced_at IS NULL OR s.last_synced_at < :cutoff)
+                  AND NOT EXISTS (
+                      SELECT 1 FROM import_jobs j
+                      WHERE j.source = s.source AND j.source_key = s.source_key
+                        AND j.status IN ('pending', 'listing', 'processing')
+                  )
+                """
+            ),
+            {"cutoff": cutoff},
+        ).fetchall()
+
+        for source, source_key, source_url in due:
+            job_id = str(uuid.uuid4())
+            db.execute(
+                text(
+                    """
+                    INSERT INTO import_jobs (
+                        id, source, source_url, source_key, job_type, status,
+                        total_files, processed_files, failed_files
+                    ) VALUES (
+                        :job_id, :source, :source_url, :source_key, 'sync', 'pending',
+                        0, 0, 0
+                    )
+                    """
+                ),
+                {
+                    "job_id": job_id,
+                    "source": source,
+                    "source_url": source_url,
+                    "source_key": source_key,
+                },
+            )
+            db.commit()
+
+            task_name, queue = SYNC_TASKS[source]
+            current_app.send_task(
+                task_name, args=[job_id, source_key, True], queue=queue
+            )
+
+        logger.info(f"Started {len(due)} watched folder syncs")
+        return {"started": len(due)}
+    finally:
+        db.close()
+
+
+def get_last_synced_at(
+    db, source: str, source_key: str, job_id: str
+) -> Optional[datetime]:
+    """
+    Get the point the next sync of a folder should start from.
+
+    Falls back to the start of the last finished import of the folder when
+    it has never been synced, and to None (sync everything) if there is none.
+    """
+    state = db.execute(
+        text(
+            """
+            SELECT last_synced_at FROM sync_states
+            WHERE source = :source AND source_key = :source_key
+            """
+        ),
+        {"source": source, "source_key": source_key},
+    ).fetchone()
+    if state and state[0]:
+        return state[0]
+
+    baseline = db.execute(
+        text(
+            """
+            SELECT max(created_at) FROM import_jobs
+            WHERE source = :source AND source_key = :source_key AND id <> :job_id
+              AND status IN ('completed', 'completed_with_errors')
+            """
+        ),
+        {"source": source, "source_key": source_key, "job_id": job_id},
+    ).fetchone()
+    return baseline[0] if baseline else None
+
+
+# Column holding each source's file ID on image rows
+SOURCE_ID_COLUMNS = {"google_drive": "google_drive_id", "dropbox": "dropbox_id"}
+
+
+def get_imported_ids(db, source: str, source_key: str) -> Set[str]:
+    """IDs of the files currently imported from a folder."""
+    column = SOURCE_ID_COLUMNS[source]
+    rows = db.execute(
+        text(
+            f"""
+            SELECT DISTINCT {column} FROM images
+            WHERE source = :source AND status = 'completed'
+              AND {column} <> ''
+              AND import_job_id IN (
+                  SELECT id FROM import_jobs
+                  WHERE source = :source AND source_key = :source_key
+              )
+            """
+        ),
+        {"source": source, "source_key": source_key},
+    ).fetchall()
+    return {row[0] for row in rows}
+
+
+def save_sync_state(
+    db,
+    job_id: str,
+    source: str,
+    source_key: str,
+    cursor: Optional[str],
+    synced_at: datetime,
+    watch: bool,
+):
+    """Record where a sync stopped; a folder stays watched once watched."""
+    db.execute(
+        text(
+            """
+            INSERT INTO sync_states (
+                source, source_key, source_url, cursor, last_synced_at, watched
+            )
+            SELECT source, source_key, source_url, :cursor, :synced_at, :watch
+            FROM import_jobs WHERE id = :job_id
+            ON CONFLICT (source, source_key) DO UPDATE
+            SET cursor = EXCLUDED.cursor,
+                last_synced_at = EXCLUDED.last_synced_at,
+                watched = sync_states.watched OR EXCLUDED.watched
+            """
+        ),
+        {
+            "job_id": job_id,
+            "cursor": cursor,
+            "synced_at": synced_at,
+            "watch": watch,
+        },
+    )
+
+
+def supersede_replaced_images(db, job_id: str):
+    """Mark older copies of files re-imported by a sync job as replaced."""
+    db.execute(
+        text(
+            """
+            UPDATE images AS old
+            SET status = 'replaced'
+            FROM images AS new
+            WHERE new.import_job_id = :job_id AND new.status = 'completed'
+              AND old.source = new.source
+              AND old.import_job_id <> :job_id AND old.status = 'completed'
+              AND ((new.google_drive_id <> ''
+                    AND old.google_drive_id = new.google_drive_id)
+                   OR (new.dropbox_id <> '' AND old.dropbox_id = new.dropbox_id))
+            """
+        ),
+        {"job_id": job_id},
+    )
@@ -1,3 +1,4 @@
 from .retry import with_retry
+from .streams import skip_bytes
 
-__all__ = ["with_retry"]
+__all__ = ["with_retry", "skip_bytes"]
@@ -0,0 +1,17 @@
+from typing import Iterable, Iterator
+
+
+def skip_bytes(chunks: Iterable[bytes], count: int) -> Iterator[bytes]:
+    """
+    Drop the first ``count`` bytes of a chunk stream.
+
+    Args:
+        chunks: Source byte chunks
+        count: Number of leading bytes to discard
+    """
+    for chunk in chunks:
+        if count >= len(chunk):
+            count -= len(chunk)
+            continue
+        yield chunk[count:]
+        count = 0
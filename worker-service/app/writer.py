@@ -0,0 +1,176 @@
+"""
+Image writer: drains image rows queued by the workers into the database.
+
+Run one or more with ``python -m app.writer`` when ``WRITE_BEHIND_ENABLED``
+is set. Stream entries are acknowledged only after the rows they carry have
+been committed, so a writer that dies mid-batch leaves them pending, and
+another writer (or the same one after a restart) claims them again. Rows
+are keyed by ``ingest_key``, so replaying them never duplicates an image or
+counts it twice towards its job's progress.
+"""
+import json
+import logging
+import os
+import signal
+import socket
+import time
+from collections import defaultdict
+from typing import List, Tuple
+
+import redis
+from sqlalchemy.exc import DataError, IntegrityError
+
+from .config import get_settings
+from .db import get_db
+from .services.clients import get_redis
+from .tasks.jobs import add_progress, insert_images, touch_images
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class ImageWriter:
+    """Consumes the image stream and bulk-inserts its rows."""
+
+    def __init__(self, redis_client: redis.Redis, consumer: str):
+        self.redis = redis_client
+        self.consumer = consumer
+        self.stream = settings.image_stream
+        self.group = settings.image_writer_group
+        self.running = True
+
+    def ensure_group(self):
+        """Create the consumer group (and stream) if it does not exist yet."""
+        try:
+            self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def run(self):
+        """Write batches until stopped."""
+        self.ensure_group()
+        logger.info(f"Image writer {self.consumer} consuming {self.stream}")
+
+        while self.running:
+            try:
+                entries = self.claim_stale() or self.read_batch()
+                if entries:
+                    self.write(entries)
+            except Exception as e:
+                # Unacknowledged entries stay pending and are claimed again
+                logger.error(f"Error writing image rows: {str(e)}")
+                time.sleep(settings.retry_delay)
+
+    def acknowledge(self, entries: List[Tuple[bytes, dict]]):
+        """Acknowledge and remove written entries."""
+        entry_ids = [entry_id for entry_id, _ in entries]
+        pipe = self.redis.pipeline()
+        pipe.xack(self.stream, self.group, *entry_ids)
+        pipe.xdel(self.stream, *entry_ids)
+        pipe.execute()
+
+    def reject(self, entry: Tuple[bytes, dict], row: dict, error: Exception):
+        """Park a row the database will never accept and fail its file."""
+        logger.error(f"Rejected image row {row}: {str(error)}")
+        self.redis.xadd(f"{self.stream}:rejected", entry[1])
+
+        add_progress(row["import_job_id"], failed=1)
+        self.acknowledge([entry])
+
+    def stop(self, *args):
+        self.running = False
+
+    def claim_stale(self) -> List[Tuple[bytes, dict]]:
+        """Take over entries left unacknowledged by a writer that died."""
+        _, entries, *_ = self.redis.xautoclaim(
+            self.stream,
+            self.group,
+            self.consumer,
+            min_idle_time=int(settings.image_writer_claim_idle * 1000),
+            count=settings.image_writer_batch_size,
+        )
+        return [(entry_id, fields) for entry_id, fields in entries if fields]
+
+    def read_batch(self) -> List[Tuple[bytes, dict]]:
+        """
+        Read up to a batch of new entries.
+
+        Waits at most ``image_writer_max_latency`` seconds after the first
+        entry arrives, so rows are written promptly when traffic is light.
+        """
+        batch = []
+        deadline = None
+
+        while len(batch) < settings.image_writer_batch_size and self.running:
+            if deadline is None:
+                block = 1000
+            else:
+                block = int((deadline - time.monotonic()) * 1000)
+                if block <= 0:
+                    break
+
+            response = self.redis.xreadgroup(
+                self.group,
+                self.consumer,
+                {self.stream: ">"},
+                count=settings.image_writer_batch_size - len(batch),
+                block=block,
+            )
+            for _, entries in response or []:
+                batch.extend(entries)
+
+            if batch and deadline is None:
+                deadline = time.monotonic() + settings.image_writer_max_latency
+            if not batch:
+                break
+
+        return batch
+
+    def write(self, entries: List[Tuple[bytes, dict]]):
+        """Insert the rows of a batch, then acknowledge its entries."""
+        rows = [json.loads(fields[b"row"]) for _, fields in entries]
+
+        db = get_db()
+        try:
+            inserted = insert_images(db, rows)
+            db.commit()
+        except (DataError, IntegrityError) as e:
+            db.rollback()
+            if len(entries) == 1:
+                self.reject(entries[0], rows[0], e)
+                return
+            # Write the rows one at a time to isolate the bad one
+            for entry in entries:
+                self.write([entry])
+            return
+        finally:
+            db.close()
+
+        # Counted before acknowledging: a crash in between replays the
+        # entries. Progress is keyed by ingest_key, so rows stored by the
+        # first attempt still count on the replay, and none count twice
+        if inserted:
+            touch_images(*(row["source"] for row in rows))
+        stored = defaultdict(list)
+        for row in rows:
+            stored[row["import_job_id"]].append(row["ingest_key"])
+        for job_id, ingest_keys in stored.items():
+            add_progress(job_id, stored=ingest_keys)
+
+        self.acknowledge(entries)
+
+        logger.info(f"Wrote {sum(inserted.values())} of {len(rows)} image rows")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    writer = ImageWriter(get_redis(), f"{socket.gethostname()}-{os.getpid()}")
+    signal.signal(signal.SIGTERM, writer.stop)
+    signal.signal(signal.SIGINT, writer.stop)
+    writer.run()
+
+
+if __name__ == "__main__":
+    main()